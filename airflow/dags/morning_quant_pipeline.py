@@ -1,5 +1,7 @@
 from datetime import timedelta
 from airflow import DAG
+from airflow.decorators import task, task_group
+from airflow.exceptions import AirflowSkipException
 from airflow.operators.python import PythonOperator
 import pendulum # Better timezone handling than standard datetime
 from airflow.utils.trigger_rule import TriggerRule
@@ -9,6 +11,7 @@ from extract import extract_market_data
 from transform import transform_market_data
 from load import load_to_postgres
 from factor_analysis import calculate_factors
+from sharding import finalize_run, plan_shards
 from validate import auto_repair_data
 
 # Set the timezone to Vancouver
@@ -26,36 +29,60 @@ with DAG(
     'morning_quant_pipeline',
     default_args=default_args,
     # This now means 7:00 AM Vancouver time, Monday-Friday
-    schedule_interval='0 6 * * 1-5', 
+    schedule_interval='0 6 * * 1-5',
     catchup=False,
     max_active_runs=1
 ) as dag:
 
-    extract_task = PythonOperator(
-        task_id='extract_market_data',
-        python_callable=extract_market_data
+    # Split the universe into PIPELINE_SHARDS slices (override per run with {"shards": N})
+    plan_task = PythonOperator(
+        task_id='plan_shards',
+        python_callable=plan_shards
     )
 
-    transform_task = PythonOperator(
-        task_id='transform_market_data',
-        python_callable=transform_market_data
-    )
+    # One mapped copy of extract -> transform -> load -> factors per shard. Every task
+    # only writes its shard's tickers and files, so retrying one leaves the others alone.
+    @task_group(group_id='shard')
+    def shard_pipeline(plan):
 
-    load_task = PythonOperator(
-        task_id='load_to_postgres',
-        python_callable=load_to_postgres
-    )
-    
-    factor_task = PythonOperator(
-        task_id='calculate_factors',
-        python_callable=calculate_factors,
-        trigger_rule=TriggerRule.NONE_FAILED
-    )
+        @task(task_id='extract_market_data')
+        def extract(plan, **context):
+            return extract_market_data(tickers=plan['tickers'], shard=plan['shard'], **context)
+
+        @task(task_id='transform_market_data')
+        def transform(plan, raw_path, **context):
+            if not raw_path:
+                raise AirflowSkipException("No new data to process")
+            return transform_market_data(raw_path=raw_path, shard=plan['shard'], **context)
+
+        @task(task_id='load_to_postgres')
+        def load(plan, clean_path, **context):
+            load_to_postgres(clean_path=clean_path, shard=plan['shard'], publish=False, **context)
 
+        # Also runs when the shard had nothing new, to catch up on back-filled bars
+        @task(task_id='calculate_factors', trigger_rule=TriggerRule.NONE_FAILED)
+        def factors(plan, **context):
+            return calculate_factors(tickers=plan['tickers'], shard=plan['shard'], publish=False, **context)
+
+        load(plan, transform(plan, extract(plan))) >> factors(plan)
+
+    shard_tasks = shard_pipeline.expand(plan=plan_task.output)
+
+    # Repairs gaps before the fan-in, so repaired bars are published with the run.
+    # Both run whatever the shards did: one shard running out of retries must not keep
+    # the others' committed bars from being served.
     validate_task = PythonOperator(
         task_id='validate_and_repair_data',
-        python_callable=auto_repair_data
+        python_callable=auto_repair_data,
+        trigger_rule=TriggerRule.ALL_DONE
+    )
+
+    # Fan-in: factors for repaired bars, serving-table refresh, registry factors, data
+    # version and panel, once per run; fails the run afterwards if a shard failed
+    finalize_task = PythonOperator(
+        task_id='finalize_run',
+        python_callable=finalize_run,
+        trigger_rule=TriggerRule.ALL_DONE
     )
 
-    # The flow remains exactly the same
-    extract_task >> transform_task >> load_task >> factor_task >> validate_task
\ No newline at end of file
+    shard_tasks >> validate_task >> finalize_task
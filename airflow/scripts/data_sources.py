@@ -0,0 +1,98 @@
+"""
+Market data sources used by the pipeline.
+
+Every source returns the same long format (date, ticker, open, high, low, close,
+adj_close, volume), so callers never deal with yfinance's wide MultiIndex frames.
+Set MARKET_DATA_SOURCE=fixture:/path/to/prices.csv to run the pipeline against a
+local file instead of the network.
+"""
+import os
+import logging
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from handoff import PRICE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# yfinance metric names -> our column names
+YF_COLUMN_MAP = {
+    'Adj Close': 'adj_close',
+    'Close': 'close',
+    'High': 'high',
+    'Low': 'low',
+    'Open': 'open',
+    'Volume': 'volume',
+}
+
+
+class MarketDataSource(ABC):
+    """Interface: fetch daily bars for `tickers` with start <= date < end."""
+
+    @abstractmethod
+    def download(self, tickers, start, end):
+        """Long-format bars (PRICE_COLUMNS) for the tickers and dates asked for."""
+
+
+class YFinanceSource(MarketDataSource):
+    def download(self, tickers, start, end):
+        import yfinance as yf
+
+        tickers = list(tickers)
+        raw = yf.download(tickers, start=start, end=end, group_by='ticker', progress=False)
+        return wide_to_long(raw, tickers)
+
+
+class FixtureSource(MarketDataSource):
+    """Serves bars from an in-memory frame or a long-format CSV - no network."""
+
+    def __init__(self, prices):
+        if isinstance(prices, (str, os.PathLike)):
+            prices = pd.read_csv(prices)
+        prices = prices.copy()
+        prices['date'] = pd.to_datetime(prices['date']).dt.date
+        self.prices = prices
+
+    def download(self, tickers, start, end):
+        df = self.prices
+        start = pd.Timestamp(start).date()
+        end = pd.Timestamp(end).date()
+        mask = df['ticker'].isin(list(tickers)) & (df['date'] >= start) & (df['date'] < end)
+        return df.loc[mask].reindex(columns=PRICE_COLUMNS).reset_index(drop=True)
+
+
+def wide_to_long(raw, tickers):
+    """Flatten a yfinance (Ticker, Metric) frame into one row per (date, ticker)."""
+    if raw is None or raw.empty:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+
+    if isinstance(raw.columns, pd.MultiIndex):
+        frames = {t: raw[t] for t in raw.columns.get_level_values(0).unique()}
+    else:
+        # Older yfinance returns flat columns for a single ticker
+        frames = {tickers[0]: raw}
+
+    df = pd.concat(frames, names=['ticker', 'date']).reset_index()
+    df = df.rename(columns=YF_COLUMN_MAP)
+
+    # Adj Close is missing when yfinance auto-adjusts; close is already adjusted then
+    if 'adj_close' not in df.columns:
+        df['adj_close'] = df['close']
+
+    df['date'] = pd.to_datetime(df['date']).dt.date
+    df = df.reindex(columns=PRICE_COLUMNS)
+    # yfinance pads tickers with NaN rows on dates where only other tickers traded
+    return df.dropna(subset=['open', 'high', 'low', 'close'], how='all').reset_index(drop=True)
+
+
+def get_data_source():
+    """Build the source named by MARKET_DATA_SOURCE (default: yfinance)."""
+    spec = os.environ.get("MARKET_DATA_SOURCE", "yfinance")
+    if spec == "yfinance":
+        return YFinanceSource()
+    if spec.startswith("fixture:"):
+        path = spec.split(":", 1)[1]
+        logger.info(f"Using fixture market data from {path}")
+        return FixtureSource(path)
+    raise ValueError(f"Unknown MARKET_DATA_SOURCE: {spec}")
@@ -1,45 +1,207 @@
-import yfinance as yf
-import pandas as pd
 import os
+import random
+import threading
+import time
 import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, timedelta
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import ProgrammingError
+
+from data_sources import get_data_source
+from handoff import PriceWriter, handoff_path, run_dir
+from metrics import stage_metrics
 
 logger = logging.getLogger(__name__)
 
-# State Check Logic
-def get_last_date_from_db():
-    db_url = os.environ.get("MARKET_DB_URL")
-    engine = create_engine(db_url)
+# Used when neither TICKER_UNIVERSE_FILE nor system.ticker_universe lists any symbols
+DEFAULT_TICKERS = ["SPY", "QQQ", "AAPL", "MSFT"]
+
+# History requested for a ticker with no watermark yet (first run or newly onboarded)
+BACKFILL_DAYS = 1888  # ~5 years of calendar days
+
+# Extraction tuning
+EXTRACT_CHUNK_SIZE = int(os.environ.get("EXTRACT_CHUNK_SIZE", "50"))       # tickers per download
+EXTRACT_MAX_WORKERS = int(os.environ.get("EXTRACT_MAX_WORKERS", "4"))      # concurrent downloads
+EXTRACT_MAX_RETRIES = int(os.environ.get("EXTRACT_MAX_RETRIES", "3"))      # attempts per chunk
+EXTRACT_BACKOFF_SECONDS = float(os.environ.get("EXTRACT_BACKOFF_SECONDS", "2"))
+EXTRACT_RATE_LIMIT = float(os.environ.get("EXTRACT_RATE_LIMIT", "2"))      # downloads started per second
+
+
+class RateLimiter:
+    """Token bucket shared by all download threads: at most `rate` calls/sec, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def load_universe():
+    """
+    Symbols to extract: TICKER_UNIVERSE_FILE (one per line, # comments) if set,
+    else the active rows of system.ticker_universe, else DEFAULT_TICKERS.
+    """
+    path = os.environ.get("TICKER_UNIVERSE_FILE")
+    if path:
+        with open(path) as f:
+            tickers = [line.split('#')[0].strip().upper() for line in f]
+        tickers = list(dict.fromkeys(t for t in tickers if t))
+        logger.info(f"Loaded {len(tickers)} tickers from {path}")
+        return tickers
+
+    engine = create_engine(os.environ.get("MARKET_DB_URL"))
+    try:
+        with engine.connect() as conn:
+            tickers = [row[0] for row in conn.execute(text(
+                "SELECT ticker FROM system.ticker_universe WHERE active ORDER BY ticker"
+            ))]
+    except ProgrammingError:
+        logger.warning("system.ticker_universe does not exist - using the default tickers")
+        tickers = []
+    return tickers or list(DEFAULT_TICKERS)
+
+def get_watermarks():
+    """{ticker: last loaded date} from system.ticker_watermarks."""
+    engine = create_engine(os.environ.get("MARKET_DB_URL"))
     with engine.connect() as conn:
-        result = conn.execute(text(
-            "SELECT value_text FROM system.state WHERE key='last_loaded_date'"
-        )).fetchone()
-        return pd.to_datetime(result[0]).date() if result else None
+        return dict(conn.execute(text("SELECT ticker, last_date FROM system.ticker_watermarks")).fetchall())
+
+def plan_ranges(tickers, watermarks, end):
+    """
+    Group tickers by the first date they are missing: {start_date: [tickers]}.
+
+    A ticker resumes the day after its watermark; one without a watermark gets a
+    full BACKFILL_DAYS history. Tickers already up to date are left out.
+    """
+    backfill_start = end - timedelta(days=BACKFILL_DAYS)
+    plan = defaultdict(list)
+    for ticker in tickers:
+        last_date = watermarks.get(ticker)
+        start = last_date + timedelta(days=1) if last_date else backfill_start
+        if start < end:
+            plan[start].append(ticker)
+    return dict(sorted(plan.items()))
+
+def fetch_chunk(source, tickers, start, end, limiter):
+    """Download one chunk, retrying with exponential backoff (plus jitter) on errors."""
+    for attempt in range(1, EXTRACT_MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            return source.download(tickers, start=start, end=end)
+        except Exception as e:
+            if attempt == EXTRACT_MAX_RETRIES:
+                raise
+            delay = EXTRACT_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            logger.warning(
+                f"Chunk {tickers[0]}..{tickers[-1]} failed (attempt {attempt}/{EXTRACT_MAX_RETRIES}): "
+                f"{str(e)} - retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+def extract_chunks(source, plan, end, writer, metrics):
+    """
+    Fetch every {start: [tickers]} group of `plan` in EXTRACT_CHUNK_SIZE chunks on a
+    bounded thread pool. Each chunk shares one date range, so it is one download.
+
+    Each finished chunk is appended to `writer` straight away (timed as the 'write'
+    step of `metrics`; downloads overlap, so only their wall time is recorded, by the
+    caller). A chunk that still fails
+    after its retries is logged and skipped instead of failing the whole extract.
+    Returns the list of tickers whose chunk failed.
+    """
+    chunks = [
+        (start, tickers[i:i + EXTRACT_CHUNK_SIZE])
+        for start, tickers in plan.items()
+        for i in range(0, len(tickers), EXTRACT_CHUNK_SIZE)
+    ]
+    limiter = RateLimiter(EXTRACT_RATE_LIMIT, burst=EXTRACT_MAX_WORKERS)
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=EXTRACT_MAX_WORKERS, thread_name_prefix="extract") as pool:
+        futures = {
+            pool.submit(fetch_chunk, source, chunk, start, end, limiter): chunk
+            for start, chunk in chunks
+        }
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                df = future.result()
+            except Exception as e:
+                logger.error(f"Giving up on {len(chunk)} tickers ({chunk[0]}..{chunk[-1]}): {str(e)}")
+                failed.extend(chunk)
+                continue
+            # Only the main thread touches the writer
+            with metrics.step('write', rows=len(df)):
+                writer.write(df)
+            logger.info(f"Fetched {len(df)} rows for {len(chunk)} tickers ({writer.rows} rows so far)")
+
+    return failed
 
 # Primary Extraction Task
-def extract_market_data(**context):
-    TICKERS = ["SPY", "QQQ", "AAPL", "MSFT"]
-    
-    # Calculate Date Range
-    last_date = get_last_date_from_db()
-    start = last_date + timedelta(days=1) if last_date else (date.today() - timedelta(days=1888))  # 3 years
-    end = date.today()
-    
-    if start >= end:
-        return None
-
-    # Fetch and Persist
-    try:
-        raw_df = yf.download(TICKERS, start=start, end=end, group_by='ticker', progress=False)
-        
-        if raw_df.empty:
-            raise ValueError("No data returned")
-
-        output_path = f"/tmp/raw_market_data_{date.today()}.csv"
-        raw_df.to_csv(output_path)
-        return output_path
-        
-    except Exception as e:
-        logger.error(f"Failed: {str(e)}")
-        raise e
\ No newline at end of file
+def extract_market_data(tickers=None, shard=None, **context):
+    """
+    Download every ticker's missing bars into this run's raw handoff file; returns its path.
+
+    The sharded DAG passes the shard's `tickers` and number; otherwise the whole
+    universe is extracted. Each shard writes its own file, so a retry only redoes it.
+    """
+    with stage_metrics('extract', context, shard) as metrics:
+        with metrics.step('plan') as step:
+            tickers = tickers or load_universe()
+
+            # Calculate Date Ranges: each ticker resumes from its own watermark
+            end = date.today()
+            try:
+                watermarks = get_watermarks()
+            except ProgrammingError as e:
+                # The load task writes these watermarks too, so the whole pipeline needs migration 002
+                raise RuntimeError(
+                    "system.ticker_watermarks does not exist - apply postgres/migrations/002_ticker_watermarks.sql"
+                ) from e
+            plan = plan_ranges(tickers, watermarks, end)
+            step.rows = len(tickers)
+
+        if not plan:
+            return None
+        for start, group in plan.items():
+            logger.info(f"{len(group)} tickers need {start}..{end}")
+        tickers = [t for group in plan.values() for t in group]
+
+        # Fetch and Persist
+        try:
+            output_path = handoff_path(run_dir(context, shard), "raw_market_data")
+            # Long (date, ticker, ...) bars, see data_sources.py
+            with PriceWriter(output_path) as writer, metrics.step('download') as step:
+                failed = extract_chunks(get_data_source(), plan, end, writer, metrics)
+                step.rows = writer.rows
+            metrics.total.rows = writer.rows
+
+            if failed and 'ti' in context:
+                context['ti'].xcom_push(key='failed_tickers', value=failed)
+            if writer.rows == 0:
+                raise ValueError("No data returned")
+
+            logger.info(f"Extracted {writer.rows} rows for {len(tickers) - len(failed)}/{len(tickers)} tickers")
+            return output_path
+
+        except Exception as e:
+            logger.error(f"Failed: {str(e)}")
+            raise e
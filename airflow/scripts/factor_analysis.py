@@ -1,62 +1,174 @@
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 import os
 import logging
-import numpy as np
+
+from indicators import compute_factors
+from metrics import stage_metrics
+from factor_panel import publish_panel
+from state import bump_data_version, update_registry_factors
 
 logger = logging.getLogger(__name__)
 
-def calculate_factors(**context):
+# Longest look-back of any factor: volatility_20d needs 20 log returns, i.e. 20 closes
+# before the first new bar (SMA/Bollinger need 19, RSI-14 needs 14)
+WARMUP_BARS = 20
+
+FACTOR_COLUMNS = [
+    'date', 'ticker', 'close', 'sma_20', 'daily_return', 'bollinger_upper',
+    'bollinger_lower', 'log_return', 'volatility_20d', 'rsi_14',
+]
+
+# Per queued ticker (system.factor_queue): its bars from the queued date on, plus the
+# WARMUP_BARS closes before it. Load queues new and revised bars and validate the
+# bars it back-fills, so only those tickers are read, never the whole history.
+PENDING_PRICES_SQL = """
+    SELECT r.date, r.ticker, r.close, q.first_date
+    FROM system.factor_queue q
+    CROSS JOIN LATERAL (
+        SELECT MIN(w.date) AS warmup_start
+        FROM (
+            SELECT date FROM raw.price_ohlcv
+            WHERE ticker = q.ticker AND date < q.first_date
+            ORDER BY date DESC
+            LIMIT :warmup
+        ) w
+    ) ws
+    JOIN raw.price_ohlcv r
+        ON r.ticker = q.ticker AND r.date >= COALESCE(ws.warmup_start, q.first_date)
+    {tickers}
+    ORDER BY r.ticker, r.date
+"""
+
+# Only the entry that was read: a ticker queued again earlier in the meantime stays
+DEQUEUE_FACTORS_SQL = "DELETE FROM system.factor_queue WHERE ticker = :ticker AND first_date = :first_date"
+
+FULL_PRICES_SQL = "SELECT date, ticker, close FROM raw.price_ohlcv {tickers} ORDER BY ticker, date"
+
+UPSERT_FACTORS_SQL = """
+    INSERT INTO analytics.factors
+        (date, ticker, close, sma_20, daily_return, bollinger_upper,
+         bollinger_lower, log_return, volatility_20d, rsi_14)
+    VALUES
+        (:date, :ticker, :close, :sma_20, :daily_return, :bollinger_upper,
+         :bollinger_lower, :log_return, :volatility_20d, :rsi_14)
+    ON CONFLICT (ticker, date) DO UPDATE SET
+        close = EXCLUDED.close,
+        sma_20 = EXCLUDED.sma_20,
+        daily_return = EXCLUDED.daily_return,
+        bollinger_upper = EXCLUDED.bollinger_upper,
+        bollinger_lower = EXCLUDED.bollinger_lower,
+        log_return = EXCLUDED.log_return,
+        volatility_20d = EXCLUDED.volatility_20d,
+        rsi_14 = EXCLUDED.rsi_14;
+"""
+
+# Serving views in dependency order: factor_snapshot reads chart_series
+SERVING_VIEWS = ['analytics.chart_series', 'analytics.factor_snapshot']
+
+def refresh_chart_series(engine):
+    """
+    Rebuild the analytics.chart_series serving table and the screener's latest-bar
+    snapshot without blocking API reads.
+
+    CONCURRENTLY diffs against the current contents via each view's unique index; the
+    VACUUM afterwards updates the visibility map so range reads stay index-only scans.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for view in SERVING_VIEWS:
+            conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+            conn.execute(text(f"VACUUM (ANALYZE) {view}"))
+
+def publish_factors(engine, metrics):
+    """
+    Publish to the API: refresh the serving tables, copy the latest factors into the
+    ticker registry, invalidate response caches and write the factor panel.
+    Returns the new data version.
+    """
+    with metrics.step('refresh'):
+        refresh_chart_series(engine)
+    with engine.begin() as conn:
+        update_registry_factors(conn)
+        version = bump_data_version(conn)
+
+    # The memory-mapped panel is tagged with the same version; the API only uses a
+    # panel whose version matches, so a failed publish just means SQL reads for now
+    raw_conn = engine.raw_connection()
+    try:
+        with metrics.step('panel'):
+            publish_panel(raw_conn, version)
+    except Exception as e:
+        logger.error(f"Factor panel publish failed (API falls back to SQL): {str(e)}")
+    finally:
+        raw_conn.close()
+    return version
+
+def calculate_factors(full_rebuild=False, tickers=None, shard=None, publish=True, **context):
+    """
+    Compute factors for the bars queued in system.factor_queue and upsert into analytics.factors.
+
+    Each queued ticker is recomputed from its earliest new, revised or back-filled bar,
+    with a WARMUP_BARS look-back, so the daily run costs O(new rows) instead of O(history). Pass full_rebuild=True (or trigger the
+    DAG with {"full_rebuild": true}) to recompute the whole table, e.g. after a backfill.
+
+    The sharded DAG passes the shard's `tickers` (only their rows are read, rebuilt or
+    written, so shards and their retries never overlap) and publish=False, leaving
+    publish_factors to the finalize task.
+    """
+    dag_run = context.get('dag_run')
+    if dag_run is not None and dag_run.conf:
+        full_rebuild = full_rebuild or bool(dag_run.conf.get('full_rebuild'))
+
     # Use the same environment variable as load.py
     db_url = os.environ.get("MARKET_DB_URL")
     if not db_url:
         raise ValueError("MARKET_DB_URL environment variable is not set")
-        
+
     engine = create_engine(db_url, pool_pre_ping=True)
-    
-    # Pull the raw data
-    query = "SELECT date, ticker, close FROM raw.price_ohlcv ORDER BY date ASC"
-    df = pd.read_sql(query, engine)
-    
-    if df.empty:
-        logger.warning("No data found in raw.price_ohlcv. Skipping factor calculation.")
-        return
-
-    # groupby ensures we don't mix AAPL prices with MSFT prices
-    df['sma_20'] = df.groupby('ticker')['close'].transform(lambda x: x.rolling(window=20).mean())
-    df['daily_return'] = df.groupby('ticker')['close'].transform(lambda x: x.pct_change())
-
-    # Calculate the 20-day Rolling Standard Deviation, different from SMA mean vs std deviation
-    df['std_dev'] = df.groupby('ticker')['close'].transform(lambda x: x.rolling(window=20).std())
-
-    # Calculate Upper and Lower Bollinger Bands. Which are just std dev times 2 and added to/subtracted from the SMA
-    df['bollinger_upper'] = df['sma_20'] + (df['std_dev'] * 2)
-    df['bollinger_lower'] = df['sma_20'] - (df['std_dev'] * 2)
-    
-    # Clean up: You don't usually need the raw std_dev in the DB just for calcs
-    df.drop(columns=['std_dev'], inplace=True)
-
-    # Daily Log Returns - Time series additive and normilizing the dist for further risk analysis
-    df['log_return'] = df.groupby('ticker')['close'].transform(lambda x: np.log(x / x.shift(1)))
-
-    # Annualized Volatility (Rolling 20-day) This is the RISK profile of the stock. Higher volatility = more risk.
-    df['volatility_20d'] = df.groupby('ticker')['log_return'].transform(
-        lambda x: x.rolling(window=20).std() * np.sqrt(252)
-    )
-
-    # RSI (14-day) Compares the mag of recent gains to recent losses over a 14 day period. Like a thermometer for momemntum.
-    def compute_rsi(series, period=14):
-        delta = series.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1+rs))
-
-    df['rsi_14'] = df.groupby('ticker')['close'].transform(compute_rsi)
-    
-    # Using 'replace' for now so it builds the table structure automatically
-    with engine.begin() as conn:
-        df.to_sql('factors', conn, schema='analytics', if_exists='replace', index=False)
-    
-    logger.info(f"Successfully calculated factors for {len(df)} rows and stored in analytics.factors.")
-    return "analytics.factors"
\ No newline at end of file
+
+    params = {"warmup": WARMUP_BARS, "tickers": list(tickers or [])}
+    with stage_metrics('factors', context, shard) as metrics:
+        # Pull the raw data
+        with metrics.step('read') as step:
+            if full_rebuild:
+                logger.info("Full rebuild requested - recomputing factors for the entire history.")
+                sql = FULL_PRICES_SQL.format(tickers="WHERE ticker = ANY(:tickers)" if tickers else "")
+            else:
+                sql = PENDING_PRICES_SQL.format(tickers="WHERE q.ticker = ANY(:tickers)" if tickers else "")
+            df = pd.read_sql(text(sql), engine, params=params)
+            step.rows = len(df)
+
+        if df.empty:
+            logger.warning("No bars queued for factors. Skipping factor calculation.")
+            return "analytics.factors"
+
+        # One vectorized pass over a bars x tickers panel (see indicators.py)
+        with metrics.step('compute', rows=len(df)):
+            df = compute_factors(df)
+
+        # Drop the warm-up bars: their factors are already stored
+        if not full_rebuild:
+            dequeued = df[['ticker', 'first_date']].drop_duplicates().to_dict(orient='records')
+            df = df[df['date'] >= df['first_date']]
+
+        # NaN -> NULL for the warm-up period of brand-new tickers
+        df = df[FACTOR_COLUMNS].astype(object)
+        records = df.where(df.notna(), None).to_dict(orient='records')
+
+        # Upsert in place so the table keeps its indexes and UNIQUE (ticker, date) constraint
+        with metrics.step('upsert', rows=len(records)), engine.begin() as conn:
+            if full_rebuild and tickers:
+                conn.execute(text("DELETE FROM analytics.factors WHERE ticker = ANY(:tickers)"), params)
+                conn.execute(text("DELETE FROM system.factor_queue WHERE ticker = ANY(:tickers)"), params)
+            elif full_rebuild:
+                conn.execute(text("TRUNCATE analytics.factors, system.factor_queue"))
+            conn.execute(text(UPSERT_FACTORS_SQL), records)
+            if not full_rebuild:
+                conn.execute(text(DEQUEUE_FACTORS_SQL), dequeued)
+        metrics.total.rows = len(records)
+
+        if publish:
+            publish_factors(engine, metrics)
+
+    logger.info(f"Successfully calculated factors for {len(records)} rows and stored in analytics.factors.")
+    return "analytics.factors"
@@ -0,0 +1,130 @@
+"""
+Dates x tickers x fields factor panel written next to the database for fast bulk reads.
+
+calculate_factors republishes it after every run from analytics.chart_series (the
+float8 serving table), so readers skip the NUMERIC -> Decimal -> float conversion.
+Each publish goes to its own directory under FACTOR_PANEL_DIR:
+
+    v<data_version>/values.npy     float64 (fields, dates, tickers), NaN where no bar
+    v<data_version>/dates.npy      int32 days since 1970-01-01, ascending
+    v<data_version>/tickers.json   column order
+    v<data_version>/manifest.json  fields, shape, data_version, created_at
+    CURRENT                        name of the live version directory (atomic rename)
+
+A field is a contiguous (dates, tickers) block, so readers can np.load the file
+with mmap_mode='r' and slice a field or a date range without copying. The reader
+is backend/panel.py. Older versions are pruned; readers that still map them keep
+their pages until they close.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+import logging
+
+import numpy as np
+import pyarrow.csv as pv
+
+logger = logging.getLogger(__name__)
+
+PANEL_DIR = os.environ.get("FACTOR_PANEL_DIR", "/tmp/quant_pipeline/factor_panel")
+PANEL_KEEP_VERSIONS = int(os.environ.get("FACTOR_PANEL_KEEP_VERSIONS", "2"))
+
+PANEL_FIELDS = [
+    'close', 'sma_20', 'daily_return', 'bollinger_upper', 'bollinger_lower',
+    'log_return', 'volatility_20d', 'rsi_14',
+]
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+def export_chart_series(cur, path):
+    """COPY every (ticker, date, *PANEL_FIELDS) row of analytics.chart_series to a CSV file."""
+    with open(path, 'w') as f:
+        cur.copy_expert(
+            f"COPY (SELECT ticker, date, {', '.join(PANEL_FIELDS)} FROM analytics.chart_series) "
+            "TO STDOUT WITH (FORMAT csv, HEADER true)",
+            f,
+        )
+
+def write_panel_files(table, directory):
+    """Pivot an Arrow table of long rows into the panel files in `directory`."""
+    tickers, ticker_idx = np.unique(table.column('ticker').to_numpy(zero_copy_only=False).astype(str), return_inverse=True)
+    days = (table.column('date').to_numpy().astype('datetime64[D]') - EPOCH).astype(np.int32)
+    dates, date_idx = np.unique(days, return_inverse=True)
+
+    # Written straight into the .npy file, so the full panel never sits in memory twice
+    values = np.lib.format.open_memmap(
+        os.path.join(directory, 'values.npy'), mode='w+', dtype=np.float64,
+        shape=(len(PANEL_FIELDS), len(dates), len(tickers)),
+    )
+    for i, field in enumerate(PANEL_FIELDS):
+        values[i] = np.nan
+        values[i, date_idx, ticker_idx] = table.column(field).to_numpy(zero_copy_only=False).astype(np.float64)
+    values.flush()
+    del values
+
+    np.save(os.path.join(directory, 'dates.npy'), dates.astype(np.int32))
+    with open(os.path.join(directory, 'tickers.json'), 'w') as f:
+        json.dump(tickers.tolist(), f)
+    return len(dates), len(tickers)
+
+def publish_panel(conn, data_version, root=PANEL_DIR):
+    """
+    Export analytics.chart_series and publish it as panel version `data_version`.
+
+    `conn` is a DB-API (psycopg2) connection. Returns the published directory.
+    """
+    started = time.perf_counter()
+    os.makedirs(root, exist_ok=True)
+    name = f"v{data_version}"
+    staging = tempfile.mkdtemp(prefix=f".{name}.", dir=root)
+    # mkdtemp is owner-only; the API runs as a different user
+    os.chmod(staging, 0o755)
+    try:
+        csv_path = os.path.join(staging, 'export.csv')
+        with conn.cursor() as cur:
+            export_chart_series(cur, csv_path)
+        table = pv.read_csv(csv_path, convert_options=pv.ConvertOptions(
+            column_types={'ticker': 'string', 'date': 'date32'},
+        ))
+        os.remove(csv_path)
+
+        n_dates, n_tickers = write_panel_files(table, staging)
+        with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+            json.dump({
+                'data_version': str(data_version),
+                'fields': PANEL_FIELDS,
+                'shape': [len(PANEL_FIELDS), n_dates, n_tickers],
+                'dtype': 'float64',
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            }, f)
+
+        target = os.path.join(root, name)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.rename(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Flip the pointer atomically, then drop versions nobody should open any more
+    pointer = os.path.join(root, 'CURRENT.tmp')
+    with open(pointer, 'w') as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(root, 'CURRENT'))
+    prune_versions(root, keep=PANEL_KEEP_VERSIONS)
+
+    logger.info(
+        f"Published factor panel {name}: {n_dates} dates x {n_tickers} tickers x {len(PANEL_FIELDS)} fields "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return target
+
+def prune_versions(root, keep):
+    versions = sorted(
+        (d for d in os.listdir(root) if d.startswith('v') and os.path.isdir(os.path.join(root, d))),
+        key=lambda d: os.path.getmtime(os.path.join(root, d)),
+    )
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
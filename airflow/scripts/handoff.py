@@ -0,0 +1,187 @@
+"""
+Intermediate files passed between the extract, transform and load tasks.
+
+Every stage reads and writes the same long price schema (PRICE_SCHEMA). The default
+format is an uncompressed Arrow IPC file: typed, columnar and opened with a memory
+map, so the next stage reads it without parsing or copying. Set
+PIPELINE_HANDOFF_FORMAT=csv to get human-readable files when debugging.
+Files live in a per-DAG-run directory under PIPELINE_DATA_DIR, which the DAG's
+finalize task removes once the run is published.
+"""
+import os
+import re
+import shutil
+import logging
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+logger = logging.getLogger(__name__)
+
+DATA_ROOT = os.environ.get("PIPELINE_DATA_DIR", "/tmp/quant_pipeline")
+HANDOFF_FORMAT = os.environ.get("PIPELINE_HANDOFF_FORMAT", "arrow")
+
+# Volume stays nullable: yfinance leaves it empty on some halted days
+PRICE_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('ticker', pa.string()),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('adj_close', pa.float64()),
+    ('volume', pa.int64()),
+])
+PRICE_COLUMNS = PRICE_SCHEMA.names
+
+EXTENSIONS = {'arrow': '.arrow', 'csv': '.csv'}
+
+# Dtypes used when the debug CSV is read back
+CSV_DTYPES = {
+    'ticker': 'string',
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'adj_close': 'float64',
+    'volume': 'Int64',
+}
+
+
+def _run_path(context):
+    run_id = context.get('run_id') or 'manual'
+    return os.path.join(DATA_ROOT, re.sub(r'[^A-Za-z0-9_.-]', '_', run_id))
+
+
+def run_dir(context, shard=None):
+    """
+    Directory scoped to this DAG run, e.g. /tmp/quant_pipeline/scheduled__2024-01-02T14_00_00_00_00,
+    with a shard_NNN subdirectory per shard so shards (and their retries) never share files.
+    """
+    path = _run_path(context)
+    if shard is not None:
+        path = os.path.join(path, f"shard_{int(shard):03d}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def remove_run_dir(context):
+    """Delete this DAG run's handoff files (every shard's) once nothing reads them any more."""
+    path = _run_path(context)
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+        logger.info(f"Removed handoff files in {path}")
+
+
+def handoff_path(directory, name, fmt=None):
+    fmt = fmt or HANDOFF_FORMAT
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown PIPELINE_HANDOFF_FORMAT: {fmt}")
+    return os.path.join(directory, name + EXTENSIONS[fmt])
+
+
+def to_table(df):
+    """Conform a long price frame to PRICE_SCHEMA (column order, types, nullability)."""
+    return pa.Table.from_pandas(df[PRICE_COLUMNS], schema=PRICE_SCHEMA, preserve_index=False)
+
+
+def write_prices(df, path):
+    """Write a long price frame in the format implied by the file extension."""
+    if path.endswith('.csv'):
+        df[PRICE_COLUMNS].to_csv(path, index=False)
+    else:
+        table = to_table(df)
+        with pa.OSFile(path, 'wb') as sink, ipc.new_file(sink, PRICE_SCHEMA) as writer:
+            writer.write_table(table)
+    logger.info(f"Wrote {len(df)} rows to {path}")
+    return path
+
+
+def read_prices(path):
+    """Read a whole handoff file as a DataFrame."""
+    if path.endswith('.csv'):
+        return _read_csv(path)
+    with pa.memory_map(path, 'r') as source:
+        return ipc.open_file(source).read_all().to_pandas()
+
+
+def iter_prices(path, chunk_rows):
+    """
+    Yield compact DataFrames of at most chunk_rows rows without loading the whole file.
+
+    Arrow files are read record batch by record batch (extract writes one per download
+    chunk). Frames use datetime64 dates, a categorical ticker and nullable Int64
+    volume rather than Python objects, so a chunk costs little more than its raw bytes.
+    """
+    if path.endswith('.csv'):
+        for chunk in pd.read_csv(path, dtype=CSV_DTYPES, chunksize=chunk_rows):
+            chunk['date'] = pd.to_datetime(chunk['date'])
+            chunk['ticker'] = chunk['ticker'].astype('category')
+            yield chunk
+        return
+    with pa.memory_map(path, 'r') as source:
+        reader = ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            for offset in range(0, batch.num_rows, chunk_rows):
+                yield _compact_frame(batch.slice(offset, chunk_rows))
+
+
+def _compact_frame(batch):
+    df = batch.to_pandas(
+        date_as_object=False,
+        strings_to_categorical=True,
+        types_mapper={pa.int64(): pd.Int64Dtype()}.get,
+    )
+    # date32 arrives as datetime64[ms]; ns keeps it consistent with the CSV path
+    df['date'] = df['date'].astype('datetime64[ns]')
+    return df
+
+
+def _read_csv(path):
+    df = pd.read_csv(path, dtype=CSV_DTYPES)
+    df['date'] = pd.to_datetime(df['date']).dt.date
+    return df
+
+
+class PriceWriter:
+    """
+    Append long price frames to one handoff file as they arrive.
+
+    Arrow output gets one record batch per write, so a partial extract is already in
+    the final format and readers can stream it batch by batch.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._csv = path.endswith('.csv')
+        if self._csv:
+            self._sink = open(path, 'w', newline='')
+        else:
+            self._sink = pa.OSFile(path, 'wb')
+            self._writer = ipc.new_file(self._sink, PRICE_SCHEMA)
+
+    def write(self, df):
+        if df.empty:
+            return
+        if self._csv:
+            df[PRICE_COLUMNS].to_csv(self._sink, index=False, header=self.rows == 0)
+        else:
+            self._writer.write_table(to_table(df))
+        self.rows += len(df)
+
+    def close(self):
+        if self._csv and self.rows == 0:
+            # Keep an empty extract readable
+            self._sink.write(','.join(PRICE_COLUMNS) + '\n')
+        if not self._csv:
+            self._writer.close()
+        self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
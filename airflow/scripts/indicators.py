@@ -0,0 +1,124 @@
+"""
+Vectorized multi-ticker indicator engine.
+
+The long (date, ticker, close) frame is pivoted once into a bars x tickers array.
+Every rolling statistic is then computed for all tickers at once with NumPy
+cumulative sums. Rows are each ticker's own bar positions rather than calendar
+dates. That way a ticker that is missing a day (or listed later) sees exactly
+the same windows as the per-ticker pandas rolling() it replaces.
+"""
+import numpy as np
+import pandas as pd
+
+SMA_WINDOW = 20
+VOL_WINDOW = 20
+RSI_PERIOD = 14
+TRADING_DAYS = 252
+
+FACTOR_NAMES = [
+    'sma_20', 'daily_return', 'bollinger_upper', 'bollinger_lower',
+    'log_return', 'volatility_20d', 'rsi_14',
+]
+
+
+# --- Panel reshaping ---
+def to_panel(tickers, values):
+    """
+    Scatter a long series into a (bars, tickers) array, left-aligned per ticker.
+
+    Rows must already be in chronological order within each ticker. Returns the
+    panel plus the (row, col) coordinates needed to gather results back.
+    """
+    codes, names = pd.factorize(tickers, sort=False)
+    rows = pd.Series(codes).groupby(codes, sort=False).cumcount().to_numpy()
+    panel = np.full((rows.max() + 1 if len(rows) else 0, len(names)), np.nan)
+    panel[rows, codes] = values
+    return panel, rows, codes, names
+
+
+# --- Rolling primitives (NaN until the window holds `window` valid values, like pandas) ---
+def rolling_sum(values, window):
+    valid = ~np.isnan(values)
+    csum = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    out = csum.copy()
+    out[window:] -= csum[:-window]
+    n = count.copy()
+    n[window:] -= count[:-window]
+    out[n < window] = np.nan
+    return out
+
+def rolling_mean(values, window):
+    return rolling_sum(values, window) / window
+
+def rolling_std(values, window):
+    """Sample (ddof=1) rolling standard deviation."""
+    # Centre each column on its first valid value so the running sums of squares
+    # stay small and the subtraction doesn't lose precision on long histories
+    first = np.argmax(~np.isnan(values), axis=0)
+    shifted = values - values[first, np.arange(values.shape[1])]
+    s1 = rolling_sum(shifted, window)
+    s2 = rolling_sum(shifted * shifted, window)
+    var = (s2 - s1 * s1 / window) / (window - 1)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+def lagged_ratio(values):
+    """values[t] / values[t-1] per column, NaN for the first bar."""
+    out = np.full_like(values, np.nan)
+    out[1:] = values[1:] / values[:-1]
+    return out
+
+def rsi(values, period=RSI_PERIOD):
+    delta = np.full_like(values, np.nan)
+    delta[1:] = values[1:] - values[:-1]
+
+    # Same as delta.where(delta > 0, 0): the leading NaN counts as a zero move
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = rolling_mean(gain, period)
+    avg_loss = rolling_mean(loss, period)
+
+    # A window with no up (down) moves is exactly zero, not cumsum round-off
+    avg_gain[rolling_sum((gain > 0).astype(float), period) == 0] = 0.0
+    avg_loss[rolling_sum((loss > 0).astype(float), period) == 0] = 0.0
+
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+# --- Factor set ---
+def panel_factors(close):
+    """Compute every factor for a (bars, tickers) close panel in one pass."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sma = rolling_mean(close, SMA_WINDOW)
+        std = rolling_std(close, SMA_WINDOW)
+        ratio = lagged_ratio(close)
+        log_return = np.log(ratio)
+        return {
+            'sma_20': sma,
+            'daily_return': ratio - 1,
+            'bollinger_upper': sma + std * 2,
+            'bollinger_lower': sma - std * 2,
+            'log_return': log_return,
+            'volatility_20d': rolling_std(log_return, VOL_WINDOW) * np.sqrt(TRADING_DAYS),
+            'rsi_14': rsi(close, RSI_PERIOD),
+        }
+
+def compute_factors(df):
+    """
+    Add the factor columns to a long (date, ticker, close) frame.
+
+    Rows must be sorted by date within each ticker. Returns the same frame with
+    FACTOR_NAMES appended, matching the per-ticker pandas rolling definitions.
+    """
+    if df.empty:
+        for name in FACTOR_NAMES:
+            df[name] = pd.Series(dtype=float)
+        return df
+
+    close = df['close'].to_numpy(dtype=float)
+    panel, rows, codes, _ = to_panel(df['ticker'].to_numpy(), close)
+
+    for name, values in panel_factors(panel).items():
+        df[name] = values[rows, codes]
+    return df
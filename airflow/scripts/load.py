@@ -1,52 +1,135 @@
 # scripts/load.py
 from sqlalchemy import create_engine, text
-import pandas as pd
+import io
+from datetime import date, timedelta
 import os
 import logging
 
+from handoff import PRICE_COLUMNS, iter_prices
+from metrics import stage_metrics
+from state import (
+    QUEUE_FACTORS_SQL, advance_watermarks, bump_data_version, ensure_partitions, register_bars, set_state,
+    update_registry_closes,
+)
+
 logger = logging.getLogger(__name__)
 
+# Rows per COPY batch: bounds the loader's memory regardless of file size
+LOAD_CHUNK_ROWS = int(os.environ.get("LOAD_CHUNK_ROWS", "50000"))
+
+# Volume is staged as NUMERIC because pandas writes 1234.0 once a column holds NaN
+CREATE_STAGE_SQL = """
+    CREATE TEMP TABLE stage_price_ohlcv (
+        ticker VARCHAR(10),
+        date DATE,
+        open NUMERIC(12, 4),
+        high NUMERIC(12, 4),
+        low NUMERIC(12, 4),
+        close NUMERIC(12, 4),
+        adj_close NUMERIC(12, 4),
+        volume NUMERIC
+    ) ON COMMIT DROP;
+"""
+
+# One set-based merge; DISTINCT ON keeps ON CONFLICT from seeing a key twice.
+# Rows go in date order so the BRIN index on date stays tight. A reloaded bar is only
+# rewritten when it changed; every new or revised bar is queued for factors.
+MERGE_STAGE_SQL = """
+    WITH merged AS (
+        INSERT INTO raw.price_ohlcv AS p
+            (ticker, date, open, high, low, close, adj_close, volume)
+        SELECT * FROM (
+            SELECT DISTINCT ON (ticker, date)
+                ticker, date, open, high, low, close, adj_close, volume::BIGINT
+            FROM stage_price_ohlcv
+            ORDER BY ticker, date
+        ) deduped
+        ORDER BY date, ticker
+        ON CONFLICT (ticker, date) DO UPDATE SET
+            open = EXCLUDED.open,
+            high = EXCLUDED.high,
+            low = EXCLUDED.low,
+            close = EXCLUDED.close,
+            adj_close = EXCLUDED.adj_close,
+            volume = EXCLUDED.volume,
+            load_ts = now()
+        WHERE (p.open, p.high, p.low, p.close, p.adj_close, p.volume)
+            IS DISTINCT FROM (EXCLUDED.open, EXCLUDED.high, EXCLUDED.low, EXCLUDED.close,
+                              EXCLUDED.adj_close, EXCLUDED.volume)
+        RETURNING ticker, date
+    ),
+    queued AS ({queue})
+    SELECT COUNT(*) FROM merged;
+""".format(queue=QUEUE_FACTORS_SQL.format(source="merged"))
+
+def copy_frame(cur, df, table, columns):
+    """Stream a DataFrame into `table` with COPY FROM STDIN (empty field = NULL)."""
+    buf = io.StringIO()
+    df.to_csv(buf, columns=columns, index=False, header=False)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
 # Primary Loading Task
-def load_to_postgres(**context):
+def load_to_postgres(clean_path=None, shard=None, publish=True, **context):
+    """
+    Merge the clean handoff file into raw.price_ohlcv.
+
+    Re-running it is harmless: the merge is an upsert, watermarks only move forward and
+    the registry only counts keys that are new. With publish=False (the sharded DAG)
+    the run-wide last_loaded_date and data version are left to the finalize task.
+    """
     # Pull Clean Path
-    clean_path = context['ti'].xcom_pull(task_ids='transform_market_data')
-    
+    clean_path = clean_path or context['ti'].xcom_pull(task_ids='transform_market_data')
+
     if not clean_path or not os.path.exists(clean_path):
         raise FileNotFoundError(f"Clean file not found at {clean_path}")
 
     # Database Connection
     db_url = os.environ.get("MARKET_DB_URL")
     engine = create_engine(db_url, pool_pre_ping=True)
-    df = pd.read_csv(clean_path)
-    
-    # Bulk Upsert Logic
-    with engine.begin() as conn:
-        # Convert DF to list of dicts for SQLAlchemy
-        records = df.to_dict(orient='records')
-        
-        # Execute the SQL with ON CONFLICT (Upsert)
-        conn.execute(text("""
-            INSERT INTO raw.price_ohlcv 
-                (ticker, date, open, high, low, close, adj_close, volume)
-            VALUES 
-                (:ticker, :date, :open, :high, :low, :close, :adj_close, :volume)
-            ON CONFLICT (ticker, date) DO UPDATE SET
-                open = EXCLUDED.open,
-                high = EXCLUDED.high,
-                low = EXCLUDED.low,
-                close = EXCLUDED.close,
-                adj_close = EXCLUDED.adj_close,
-                volume = EXCLUDED.volume,
-                load_ts = now();
-        """), records)
-
-        # Update the State Cursor
-        max_date = df['date'].max()
-        conn.execute(text("""
-            INSERT INTO system.state (key, value_text, updated_at)
-            VALUES ('last_loaded_date', :date_val, now())
-            ON CONFLICT (key) DO UPDATE 
-            SET value_text = EXCLUDED.value_text, updated_at = EXCLUDED.updated_at;
-        """), {"date_val": max_date})
-        
-    logger.info(f"Successfully loaded {len(records)} records to Postgres.")
+
+    # Bulk Upsert Logic: COPY into a temp staging table, then merge once
+    with stage_metrics('load', context, shard) as metrics, engine.begin() as conn:
+        with conn.connection.cursor() as cur:
+            cur.execute(CREATE_STAGE_SQL)
+            for chunk in metrics.timed('parse', iter_prices(clean_path, LOAD_CHUNK_ROWS)):
+                with metrics.step('copy', rows=len(chunk)):
+                    copy_frame(cur, chunk, 'stage_price_ohlcv', PRICE_COLUMNS)
+        staged = metrics.steps['parse'].rows or 0
+
+        if staged == 0:
+            logger.warning(f"No rows found in {clean_path} - nothing to load.")
+            return
+
+        # Partitions for every staged year, and next year's ahead of time
+        with metrics.step('partitions'):
+            min_date, max_date = conn.execute(text("SELECT MIN(date), MAX(date) FROM stage_price_ohlcv")).fetchone()
+            created = ensure_partitions(conn, min_date, max(max_date, date.today() + timedelta(days=365)))
+        if created:
+            logger.info(f"Created {created} new yearly partitions")
+
+        # Registry counts only keys that are new to raw, so it goes before the merge
+        with metrics.step('registry') as step:
+            step.rows = register_bars(conn, 'stage_price_ohlcv')
+
+        with metrics.step('merge') as step:
+            merged = step.rows = conn.execute(text(MERGE_STAGE_SQL)).scalar()
+
+        with metrics.step('registry_close') as step:
+            step.rows = update_registry_closes(conn, 'stage_price_ohlcv')
+
+        # Update the State Cursors: one watermark per ticker, plus the global date for reference
+        with metrics.step('watermarks') as step:
+            advanced = step.rows = advance_watermarks(conn, 'stage_price_ohlcv')
+            if publish:
+                set_state(conn, 'last_loaded_date', max_date)
+
+        # Invalidate API response caches once this transaction commits
+        if publish:
+            bump_data_version(conn)
+        metrics.total.rows = merged
+
+    logger.info(
+        f"Successfully loaded {merged} records to Postgres from {staged} staged rows; "
+        f"advanced watermarks for {advanced} tickers."
+    )
@@ -0,0 +1,167 @@
+"""
+Wall time, row counts and peak memory for pipeline stages and their steps.
+
+Each task wraps its body in stage_metrics() and times the interesting parts:
+
+    with stage_metrics('load', context) as metrics:
+        with metrics.step('copy') as step:
+            ...
+            step.rows = staged
+        for chunk in metrics.timed('parse', iter_prices(path)):
+            ...
+
+A step entered more than once (per chunk, per batch) accumulates into one record.
+When the stage ends, the steps plus a 'total' row go to system.pipeline_metrics
+with the DAG run id and whether the stage succeeded; the API renders the latest
+run in Prometheus text format (/api/system/pipeline/metrics). Recording is best
+effort and never fails a task.
+
+Peak memory is the process's RSS high-water mark (ru_maxrss) when the step last
+finished, so it is a running maximum within a task, not a per-step delta.
+"""
+import os
+import time
+import logging
+import resource
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, text
+
+logger = logging.getLogger(__name__)
+
+INSERT_METRICS_SQL = """
+    INSERT INTO system.pipeline_metrics
+        (run_id, stage, shard, step, status, started_at, seconds, rows, calls, peak_rss_mb)
+    VALUES
+        (:run_id, :stage, :shard, :step, :status, :started_at, :seconds, :rows, :calls, :peak_rss_mb)
+"""
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StepMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.started_at = None
+        self.seconds = 0.0
+        self.rows = None
+        self.calls = 0
+        self.peak_rss_mb = None
+
+    def add_rows(self, n):
+        self.rows = (self.rows or 0) + n
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.rows is not None and self.seconds > 0 else None
+
+    def summary(self):
+        rate = f", {self.rows_per_second:,.0f} rows/s" if self.rows_per_second is not None else ""
+        rows = f", {self.rows:,} rows" if self.rows is not None else ""
+        return f"{self.name} {self.seconds:.2f}s{rows}{rate} (peak RSS {self.peak_rss_mb:.0f} MB)"
+
+
+class StageMetrics:
+    """Steps of one stage run, in the order they were first entered."""
+
+    def __init__(self, stage, run_id, shard=None):
+        self.stage = stage
+        self.run_id = run_id
+        self.shard = shard
+        self.steps = {}
+        self.total = StepMetrics('total')
+
+    def _get(self, name):
+        if name not in self.steps:
+            self.steps[name] = StepMetrics(name)
+        return self.steps[name]
+
+    @contextmanager
+    def step(self, name, rows=None):
+        """Time a block; set `.rows` (or call add_rows) on the yielded step to record throughput."""
+        step = self._get(name)
+        if rows is not None:
+            step.add_rows(rows)
+        step.started_at = step.started_at or datetime.now(timezone.utc)
+        started = time.perf_counter()
+        try:
+            yield step
+        finally:
+            step.seconds += time.perf_counter() - started
+            step.calls += 1
+            step.peak_rss_mb = peak_rss_mb()
+
+    def timed(self, name, batches):
+        """Yield from an iterator of batches, timing each next() as `name` and counting rows."""
+        iterator = iter(batches)
+        while True:
+            with self.step(name) as step:
+                try:
+                    batch = next(iterator)
+                except StopIteration:
+                    return
+                step.add_rows(len(batch))
+            yield batch
+
+    def records(self, status):
+        return [
+            {
+                'run_id': self.run_id,
+                'stage': self.stage,
+                'shard': self.shard,
+                'step': step.name,
+                'status': status,
+                'started_at': step.started_at,
+                'seconds': step.seconds,
+                'rows': step.rows,
+                'calls': max(step.calls, 1),
+                'peak_rss_mb': step.peak_rss_mb,
+            }
+            for step in [*self.steps.values(), self.total]
+            if step.started_at is not None
+        ]
+
+    def save(self, status, db_url=None):
+        """Append this run's steps to system.pipeline_metrics; logs instead of raising."""
+        db_url = db_url or os.environ.get("MARKET_DB_URL")
+        if not db_url:
+            return
+        try:
+            engine = create_engine(db_url)
+            with engine.begin() as conn:
+                conn.execute(text(INSERT_METRICS_SQL), self.records(status))
+            engine.dispose()
+        except Exception as e:
+            logger.warning(f"Could not record {self.stage} metrics: {str(e)}")
+
+
+def run_id_from(context):
+    run_id = (context or {}).get('run_id')
+    return run_id or f"manual__{datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')}"
+
+
+@contextmanager
+def stage_metrics(stage, context=None, shard=None):
+    """
+    Time a whole task as `stage` (of one `shard` in the sharded DAG), then log a per-step
+    summary and persist it, whether the task succeeded or raised. Set
+    `metrics.total.rows` to record the stage's output.
+    """
+    metrics = StageMetrics(stage, run_id_from(context), shard)
+    total = metrics.total
+    total.started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    status = 'failed'
+    try:
+        yield metrics
+        status = 'success'
+    finally:
+        total.seconds = time.perf_counter() - started
+        total.calls = 1
+        total.peak_rss_mb = peak_rss_mb()
+        label = stage if shard is None else f"{stage}[{shard}]"
+        logger.info(f"[metrics] {label} {status}: " + "; ".join(s.summary() for s in [*metrics.steps.values(), total]))
+        metrics.save(status)
@@ -0,0 +1,121 @@
+"""
+Fan-out / fan-in helpers for the sharded DAG.
+
+plan_shards() splits the universe into PIPELINE_SHARDS contiguous slices (a run can
+override the count with {"shards": N}); each slice then runs extract -> transform ->
+load -> factors as its own mapped task group. Shard writes only ever touch the
+shard's own tickers (upserts keyed by ticker, forward-only watermarks, per-shard
+handoff directories), so a retried shard redoes nothing the others did.
+finalize_run() does the run-wide work once every shard and the validate task are done.
+"""
+import os
+import logging
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+
+from extract import BACKFILL_DAYS, load_universe
+from factor_analysis import calculate_factors, publish_factors
+from handoff import remove_run_dir
+from metrics import stage_metrics
+from state import ensure_partitions, set_state
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_SHARDS = int(os.environ.get("PIPELINE_SHARDS", "4"))
+
+def split_universe(tickers, n_shards):
+    """Sorted tickers cut into at most n_shards contiguous, nearly equal slices."""
+    tickers = sorted(tickers)
+    n_shards = max(1, min(n_shards, len(tickers)))
+    size, extra = divmod(len(tickers), n_shards)
+    shards, start = [], 0
+    for i in range(n_shards):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(tickers[start:end])
+        start = end
+    return [s for s in shards if s]
+
+def plan_shards(**context):
+    """
+    Return [{"shard": i, "tickers": [...]}, ...] for the mapped task group.
+
+    Also creates every yearly partition a first-time backfill or next year's bars can
+    need, so the shard loads don't race each other to create them.
+    """
+    n_shards = PIPELINE_SHARDS
+    dag_run = context.get('dag_run')
+    if dag_run is not None and dag_run.conf and dag_run.conf.get('shards'):
+        n_shards = int(dag_run.conf['shards'])
+
+    tickers = load_universe()
+    shards = split_universe(tickers, n_shards)
+
+    engine = create_engine(os.environ.get("MARKET_DB_URL"), pool_pre_ping=True)
+    with engine.begin() as conn:
+        today = date.today()
+        created = ensure_partitions(conn, today - timedelta(days=BACKFILL_DAYS), today + timedelta(days=365))
+    if created:
+        logger.info(f"Created {created} new yearly partitions")
+
+    logger.info(f"Split {len(tickers)} tickers into {len(shards)} shards of up to {max(map(len, shards))}")
+    return [{"shard": i, "tickers": shard} for i, shard in enumerate(shards)]
+
+LAST_LOADED_SQL = "SELECT MAX(last_date) FROM system.ticker_watermarks"
+
+# Task group id of the per-shard tasks in the DAG
+SHARD_GROUP = 'shard'
+
+def failed_shards(context):
+    """Map indexes of the shards with a task that failed for good (or never ran because of one)."""
+    dag_run = context.get('dag_run')
+    if dag_run is None:
+        return []
+    return sorted({
+        ti.map_index for ti in dag_run.get_task_instances(state=['failed', 'upstream_failed'])
+        if ti.task_id.startswith(f"{SHARD_GROUP}.")
+    })
+
+def failed_tickers(context):
+    """Tickers whose download chunk gave up, as pushed by every shard's extract task."""
+    ti = context.get('ti')
+    if ti is None:
+        return []
+    pushed = ti.xcom_pull(task_ids=f"{SHARD_GROUP}.extract_market_data", key='failed_tickers') or []
+    return sorted({ticker for tickers in pushed if tickers for ticker in tickers})
+
+def finalize_run(**context):
+    """
+    Fan-in after every shard and the validate task: compute factors for bars still
+    queued (validate's repairs), record the run-wide last_loaded_date, then refresh the
+    serving tables, copy factors into the registry, bump the data version and publish
+    the factor panel (see factor_analysis.publish_factors) exactly once.
+
+    Runs even when a shard failed, so what the other shards committed is served (and
+    a failed shard's loaded bars still get their factors from the queue); the task
+    then fails to flag the run. Tickers whose download failed are logged and kept in
+    system.state 'failed_tickers'; their watermarks did not move, so the next run
+    fetches them again. The run's handoff directory is deleted at the end.
+    """
+    # Only the run id: a {"full_rebuild": true} run was already rebuilt by the shards
+    calculate_factors(publish=False, run_id=context.get('run_id'))
+
+    shards, tickers = failed_shards(context), failed_tickers(context)
+    engine = create_engine(os.environ.get("MARKET_DB_URL"), pool_pre_ping=True)
+    with stage_metrics('finalize', context) as metrics:
+        with metrics.step('state'), engine.begin() as conn:
+            last_loaded = conn.execute(text(LAST_LOADED_SQL)).scalar()
+            if last_loaded is not None:
+                set_state(conn, 'last_loaded_date', last_loaded)
+            set_state(conn, 'failed_tickers', ','.join(tickers))
+
+        version = publish_factors(engine, metrics)
+
+    # Every shard's handoff files have been loaded (or their shard failed for good)
+    remove_run_dir(context)
+    logger.info(f"Published data version {version} (last loaded date {last_loaded})")
+    if tickers:
+        logger.error(f"{len(tickers)} tickers could not be downloaded and will be retried next run: {', '.join(tickers)}")
+    if shards:
+        raise RuntimeError(f"Shards {shards} failed - published what the other shards committed")
+    return version
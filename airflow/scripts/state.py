@@ -0,0 +1,144 @@
+# scripts/state.py
+from sqlalchemy import text
+
+# Monotonic stamp the API uses to invalidate its response cache (see backend/cache.py)
+BUMP_DATA_VERSION_SQL = """
+    INSERT INTO system.state (key, value_text, updated_at)
+    VALUES ('data_version', '1', now())
+    ON CONFLICT (key) DO UPDATE
+    SET value_text = (COALESCE(system.state.value_text, '0')::BIGINT + 1)::TEXT,
+        updated_at = now()
+    RETURNING value_text;
+"""
+
+SET_STATE_SQL = """
+    INSERT INTO system.state (key, value_text, updated_at)
+    VALUES (:key, :value, now())
+    ON CONFLICT (key) DO UPDATE
+    SET value_text = EXCLUDED.value_text, updated_at = EXCLUDED.updated_at;
+"""
+
+# Per-ticker high-water marks: the last bar date loaded for each symbol. `source` is
+# any relation with (ticker, date) columns; marks only ever move forward.
+ADVANCE_WATERMARKS_SQL = """
+    INSERT INTO system.ticker_watermarks (ticker, last_date, updated_at)
+    SELECT ticker, MAX(date), now()
+    FROM {source}
+    GROUP BY ticker
+    ON CONFLICT (ticker) DO UPDATE
+    SET last_date = GREATEST(system.ticker_watermarks.last_date, EXCLUDED.last_date),
+        updated_at = EXCLUDED.updated_at;
+"""
+
+# Queue the bars in `source` (a relation with (ticker, date) columns) for factor
+# computation: each ticker keeps the earliest date still to do. No trailing semicolon,
+# so it can also be used as a data-modifying CTE.
+QUEUE_FACTORS_SQL = """
+    INSERT INTO system.factor_queue AS q (ticker, first_date, queued_at)
+    SELECT ticker, MIN(date), now()
+    FROM {source}
+    GROUP BY ticker
+    ON CONFLICT (ticker) DO UPDATE
+    SET first_date = LEAST(q.first_date, EXCLUDED.first_date),
+        queued_at = EXCLUDED.queued_at
+"""
+
+# analytics.ticker_registry: per-symbol summary so readers never scan the bars for it.
+# `source` is a relation with (ticker, date) columns. Counting is incremental: run it
+# before those bars are merged, so only keys not yet in raw.price_ohlcv add to row_count.
+REGISTER_BARS_SQL = """
+    INSERT INTO analytics.ticker_registry AS reg (ticker, first_date, last_date, row_count, updated_at)
+    SELECT s.ticker, MIN(s.date), MAX(s.date), COUNT(*) FILTER (WHERE r.ticker IS NULL), now()
+    FROM (SELECT DISTINCT ticker, date FROM {source}) s
+    LEFT JOIN raw.price_ohlcv r ON r.ticker = s.ticker AND r.date = s.date
+    GROUP BY s.ticker
+    ON CONFLICT (ticker) DO UPDATE
+    SET first_date = LEAST(reg.first_date, EXCLUDED.first_date),
+        last_date = GREATEST(reg.last_date, EXCLUDED.last_date),
+        row_count = reg.row_count + EXCLUDED.row_count,
+        updated_at = EXCLUDED.updated_at;
+"""
+
+# Exact recount from the bars themselves, for a handful of tickers (repairs) or a rebuild
+SYNC_REGISTRY_SQL = """
+    INSERT INTO analytics.ticker_registry AS reg (ticker, first_date, last_date, row_count, updated_at)
+    SELECT ticker, MIN(date), MAX(date), COUNT(*), now()
+    FROM {source}
+    GROUP BY ticker
+    ON CONFLICT (ticker) DO UPDATE
+    SET first_date = EXCLUDED.first_date,
+        last_date = EXCLUDED.last_date,
+        row_count = EXCLUDED.row_count,
+        updated_at = EXCLUDED.updated_at;
+"""
+
+# Latest close and day change of the tickers in `source`: two primary-key probes each
+REGISTRY_CLOSES_SQL = """
+    UPDATE analytics.ticker_registry reg
+    SET last_close = b.closes[1],
+        prev_close = b.closes[2],
+        day_change = b.closes[1] / NULLIF(b.closes[2], 0) - 1,
+        updated_at = now()
+    FROM (SELECT DISTINCT ticker FROM {source}) t
+    CROSS JOIN LATERAL (
+        SELECT ARRAY(
+            SELECT p.close::float8 FROM raw.price_ohlcv p
+            WHERE p.ticker = t.ticker
+            ORDER BY p.date DESC
+            LIMIT 2
+        ) AS closes
+    ) b
+    WHERE reg.ticker = t.ticker;
+"""
+
+# Latest factors, copied from the screener snapshot once it has been refreshed
+REGISTRY_FACTORS_SQL = """
+    UPDATE analytics.ticker_registry reg
+    SET factors_date = s.date,
+        sma_20 = s.sma_20,
+        rsi_14 = s.rsi_14,
+        volatility_20d = s.volatility_20d,
+        bollinger_upper = s.bollinger_upper,
+        bollinger_lower = s.bollinger_lower
+    FROM analytics.factor_snapshot s
+    WHERE s.ticker = reg.ticker;
+"""
+
+# Tables range-partitioned by year (see system.ensure_year_partitions in init.sql)
+PARTITIONED_TABLES = ('raw.price_ohlcv', 'analytics.factors')
+
+ENSURE_PARTITIONS_SQL = "SELECT system.ensure_year_partitions(CAST(:parent AS regclass), :from_date, :to_date)"
+
+def set_state(conn, key, value):
+    """Upsert a system.state key inside the caller's transaction."""
+    conn.execute(text(SET_STATE_SQL), {"key": key, "value": str(value)})
+
+def bump_data_version(conn):
+    """Signal that served data changed; commits with the caller's transaction."""
+    return conn.execute(text(BUMP_DATA_VERSION_SQL)).scalar()
+
+def advance_watermarks(conn, source):
+    """Move each ticker's watermark up to the newest date found in `source`."""
+    return conn.execute(text(ADVANCE_WATERMARKS_SQL.format(source=source))).rowcount
+
+def queue_factors(conn, source):
+    """Have the next calculate_factors recompute the tickers in `source` from their earliest date."""
+    return conn.execute(text(QUEUE_FACTORS_SQL.format(source=source))).rowcount
+
+def register_bars(conn, source):
+    """Fold the bars in `source` into the ticker registry; call before merging them into raw."""
+    return conn.execute(text(REGISTER_BARS_SQL.format(source=source))).rowcount
+
+def update_registry_closes(conn, source):
+    """Refresh last close / day change for the tickers in `source`; call after the merge."""
+    return conn.execute(text(REGISTRY_CLOSES_SQL.format(source=source))).rowcount
+
+def update_registry_factors(conn):
+    return conn.execute(text(REGISTRY_FACTORS_SQL)).rowcount
+
+def ensure_partitions(conn, from_date, to_date):
+    """Create the yearly partitions both tables need for from_date..to_date; returns how many were new."""
+    return sum(
+        conn.execute(text(ENSURE_PARTITIONS_SQL), {"parent": parent, "from_date": from_date, "to_date": to_date}).scalar()
+        for parent in PARTITIONED_TABLES
+    )
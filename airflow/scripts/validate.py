@@ -1,8 +1,15 @@
 import psycopg2
-import yfinance as yf
+from psycopg2.extras import execute_values
 import os
 import logging
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import timedelta
+
+import pandas as pd
+
+from data_sources import get_data_source
+from metrics import stage_metrics
+from state import ADVANCE_WATERMARKS_SQL, QUEUE_FACTORS_SQL, REGISTRY_CLOSES_SQL, SYNC_REGISTRY_SQL
 
 # Setup logging to see output in Airflow
 logger = logging.getLogger(__name__)
@@ -25,104 +32,173 @@ def get_db_connection():
         
     return psycopg2.connect(db_url)
 
-def auto_repair_data():
+# Every (ticker, date) where the reference ticker traded but the ticker has no bar,
+# collapsed into contiguous runs of reference trading days (gaps-and-islands).
+# Only dates from each ticker's first bar onward count, so a late listing isn't a gap;
+# first dates come from the ticker registry rather than a scan of every bar.
+GAP_RANGES_SQL = """
+WITH calendar AS (
+    SELECT date, ROW_NUMBER() OVER (ORDER BY date) AS idx
+    FROM raw.price_ohlcv
+    WHERE ticker = %(reference)s
+),
+tickers AS (
+    SELECT ticker, first_date
+    FROM analytics.ticker_registry
+    WHERE ticker <> %(reference)s
+),
+gaps AS (
+    SELECT t.ticker, c.date,
+           c.idx - ROW_NUMBER() OVER (PARTITION BY t.ticker ORDER BY c.idx) AS run_id
+    FROM tickers t
+    JOIN calendar c ON c.date >= t.first_date
+    WHERE NOT EXISTS (
+        SELECT 1 FROM raw.price_ohlcv p
+        WHERE p.ticker = t.ticker AND p.date = c.date
+    )
+)
+SELECT ticker, MIN(date) AS start_date, MAX(date) AS end_date, COUNT(*) AS missing
+FROM gaps
+GROUP BY ticker, run_id
+ORDER BY start_date, ticker;
+"""
+
+INSERT_BARS_SQL = """
+INSERT INTO raw.price_ohlcv (ticker, date, open, high, low, close, adj_close, volume)
+VALUES %s
+ON CONFLICT (ticker, date) DO NOTHING;
+"""
+
+# Earliest repaired date per ticker, as a (ticker, date) relation for QUEUE_FACTORS_SQL
+REPAIRED_BARS = "unnest(%(tickers)s::varchar[], %(dates)s::date[]) AS repaired(ticker, date)"
+
+REFERENCE_TICKER = "SPY"
+PRICE_ROW_COLUMNS = ['ticker', 'date', 'open', 'high', 'low', 'close', 'adj_close', 'volume']
+REPAIR_BATCH_SIZE = int(os.environ.get("REPAIR_BATCH_SIZE", "100"))
+
+def find_gap_ranges(cur, reference=REFERENCE_TICKER):
+    """Return [(ticker, start_date, end_date, missing_days)] in one set-based query."""
+    cur.execute(GAP_RANGES_SQL, {"reference": reference})
+    return cur.fetchall()
+
+def plan_downloads(gap_ranges, batch_size=REPAIR_BATCH_SIZE):
+    """Group tickers sharing a date range, then split each group into batches of batch_size."""
+    by_range = defaultdict(list)
+    for ticker, start_date, end_date, _ in gap_ranges:
+        by_range[(start_date, end_date)].append(ticker)
+
+    for (start_date, end_date), tickers in sorted(by_range.items()):
+        for i in range(0, len(tickers), batch_size):
+            yield start_date, end_date, tickers[i:i + batch_size]
+
+def fetch_missing_bars(source, gap_ranges, batch_size=REPAIR_BATCH_SIZE):
+    """Download every gap range with one call per batch of tickers; returns insert-ready tuples."""
+    rows = []
+    for start_date, end_date, tickers in plan_downloads(gap_ranges, batch_size):
+        start_str = start_date.strftime('%Y-%m-%d')
+        # yfinance treats end as exclusive
+        end_str = (end_date + timedelta(days=1)).strftime('%Y-%m-%d')
+        try:
+            data = source.download(tickers, start_str, end_str)
+        except Exception as e:
+            logger.error(f"   [ERROR] Failed to fetch {len(tickers)} tickers for {start_str}..{end_str}: {str(e)}")
+            continue
+
+        data = data[(data['date'] >= start_date) & (data['date'] <= end_date)]
+        data = data.dropna(subset=['open', 'high', 'low', 'close'])
+        if data.empty:
+            logger.warning(f"   [SKIP] No data found for {len(tickers)} tickers in {start_str}..{end_str}")
+            continue
+
+        data = data.assign(adj_close=data['adj_close'].fillna(data['close']))
+        rows.extend(
+            (t, d, float(o), float(h), float(l), float(c), float(a), int(v) if pd.notna(v) else None)
+            for t, d, o, h, l, c, a, v in data[PRICE_ROW_COLUMNS].itertuples(index=False, name=None)
+        )
+        logger.info(f"   [FETCHED] {len(data)} bars for {len(tickers)} tickers in {start_str}..{end_str}")
+    return rows
+
+def auto_repair_data(source=None, reference=REFERENCE_TICKER, **context):
     """
     Main logic: Identify gaps where SPY has data but others don't, 
     then fetch and insert missing points.
+
+    Gaps are found with a single query, merged into contiguous date ranges, fetched
+    in multi-ticker batches through `source` (see data_sources.py) and written with
+    one bulk insert. Repaired bars are queued for factors; the DAG runs this before
+    finalize_run, which computes them and publishes the run once.
     """
-    conn = None
-    cur = None
+    with stage_metrics('validate', context) as metrics:
+        conn = None
+        cur = None
+        source = source or get_data_source()
     
-    try:
-        logger.info("Connecting to database for validation check...")
-        conn = get_db_connection()
-        cur = conn.cursor()
+        try:
+            logger.info("Connecting to database for validation check...")
+            conn = get_db_connection()
+            cur = conn.cursor()
+        
+            # 1. Find every gap against the reference calendar at once
+            with metrics.step('find_gaps') as step:
+                gap_ranges = find_gap_ranges(cur, reference)
+                step.rows = len(gap_ranges)
+        
+            if not gap_ranges:
+                logger.info(f"✅ All tickers are fully aligned with {reference}.")
+                return
         
-        # 1. Get the list of all tickers except the reference (SPY)
-        cur.execute("SELECT DISTINCT ticker FROM raw.price_ohlcv WHERE ticker != %s;", ('SPY',))
-        tickers = [row[0] for row in cur.fetchall()]
+            missing_total = sum(r[3] for r in gap_ranges)
+            tickers = {r[0] for r in gap_ranges}
+            logger.warning(
+                f"⚠️ Found {missing_total} missing days in {len(gap_ranges)} ranges "
+                f"across {len(tickers)} tickers. Starting repair..."
+            )
         
-        if not tickers:
-            logger.info("No tickers found in database to validate.")
-            return
+            # 2. Batched downloads: one call per (date range, ticker batch)
+            with metrics.step('download') as step:
+                rows = fetch_missing_bars(source, gap_ranges)
+                step.rows = len(rows)
         
-        for ticker in tickers:
-            # 2. Find dates where SPY exists but this ticker doesn't (The Gap Finder)
-            query = """
-            SELECT s.date 
-            FROM (SELECT date FROM raw.price_ohlcv WHERE ticker = 'SPY') s
-            LEFT JOIN (SELECT date FROM raw.price_ohlcv WHERE ticker = %s) t 
-              ON s.date = t.date
-            WHERE t.date IS NULL;
-            """
-            cur.execute(query, (ticker,))
-            missing_dates = [row[0] for row in cur.fetchall()]
-            
-            if not missing_dates:
-                logger.info(f"✅ {ticker} is fully aligned with SPY.")
-                continue
-                
-            logger.warning(f"⚠️ Found {len(missing_dates)} missing days for {ticker}. Starting repair...")
-            
-            for missing_date in missing_dates:
-                # 3. Prepare timeframe for yfinance
-                start_str = missing_date.strftime('%Y-%m-%d')
-                end_dt = missing_date + timedelta(days=1)
-                end_str = end_dt.strftime('%Y-%m-%d')
-                
-                try:
-                    # 4. Download missing data point
-                    data = yf.download(ticker, start=start_str, end=end_str, progress=False)
-                    
-                    if not data.empty:
-                        row = data.iloc[0]
-                        
-                        # Handle Adjusted Close logic
-                        adj_close = float(row.get('Adj Close', row.get('Close', row['Close'])))
-                        
-                        # 5. Insert the missing data
-                        insert_query = """
-                        INSERT INTO raw.price_ohlcv (ticker, date, open, high, low, close, adj_close, volume)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (ticker, date) DO NOTHING;
-                        """
-                        cur.execute(insert_query, (
-                            ticker, 
-                            missing_date, 
-                            float(row['Open']), 
-                            float(row['High']), 
-                            float(row['Low']), 
-                            float(row['Close']), 
-                            adj_close, 
-                            int(row['Volume'])
-                        ))
-                        logger.info(f"   [FIXED] {ticker} for {start_str}")
-                    else:
-                        logger.warning(f"   [SKIP] No data found on yfinance for {ticker} on {start_str}")
-                        
-                except Exception as e:
-                    logger.error(f"   [ERROR] Failed to fetch {ticker} on {start_str}: {str(e)}")
-                    continue
+            # 3. One bulk insert for everything we recovered
+            if rows:
+                with metrics.step('insert', rows=len(rows)):
+                    execute_values(cur, INSERT_BARS_SQL, rows, page_size=1000)
+                metrics.total.rows = len(rows)
+                logger.info(f"   [FIXED] Inserted {len(rows)} of {missing_total} missing bars")
+                # A repaired trailing gap moves that ticker's watermark forward; the
+                # registry is recounted exactly for the few repaired tickers
+                repaired = {"tickers": sorted({r[0] for r in rows})}
+                repaired_from = "raw.price_ohlcv WHERE ticker = ANY(%(tickers)s)"
+                cur.execute(ADVANCE_WATERMARKS_SQL.format(source=repaired_from), repaired)
+                cur.execute(SYNC_REGISTRY_SQL.format(source=repaired_from), repaired)
+                cur.execute(REGISTRY_CLOSES_SQL.format(source=repaired_from), repaired)
+                # finalize_run computes their factors and publishes them with the rest of the run
+                first_repaired = {}
+                for r in rows:
+                    first_repaired[r[0]] = min(r[1], first_repaired.get(r[0], r[1]))
+                cur.execute(QUEUE_FACTORS_SQL.format(source=REPAIRED_BARS), {
+                    "tickers": list(first_repaired), "dates": list(first_repaired.values()),
+                })
         
-        # Finalize changes
-        conn.commit()
-        logger.info("✅ Data integrity check and repair completed successfully.")
+            # Finalize changes
+            conn.commit()
+            logger.info("✅ Data integrity check and repair completed successfully.")
         
-    except psycopg2.Error as e:
-        logger.error(f"❌ Database error during validation: {str(e)}")
-        if conn:
-            conn.rollback()
-        raise
-    except Exception as e:
-        logger.error(f"❌ Unexpected error: {str(e)}")
-        if conn:
-            conn.rollback()
-        raise
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
+        except psycopg2.Error as e:
+            logger.error(f"❌ Database error during validation: {str(e)}")
+            if conn:
+                conn.rollback()
+            raise
+        except Exception as e:
+            logger.error(f"❌ Unexpected error: {str(e)}")
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if cur:
+                cur.close()
+            if conn:
+                conn.close()
 
 if __name__ == "__main__":
     auto_repair_data()
\ No newline at end of file
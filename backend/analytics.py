@@ -0,0 +1,112 @@
+"""
+Cross-sectional statistics over daily log returns, computed server-side with NumPy.
+
+Inputs come from build_batch_query / align_batch (series.py): a shared date axis and
+one float64 array per ticker with NaN where the ticker has no bar. Every statistic
+uses pairwise-complete observations, so a missing day in one ticker never poisons
+another pair.
+"""
+import numpy as np
+
+MAX_WINDOW = 2520
+MAX_MATRIX_TICKERS = 500
+
+
+def parse_window(window, minimum=2):
+    if not minimum <= window <= MAX_WINDOW:
+        raise ValueError(f"window must be between {minimum} and {MAX_WINDOW}")
+    return window
+
+
+def _rolling_sum(values, window):
+    csum = np.cumsum(values, axis=0)
+    out = csum.copy()
+    out[window:] -= csum[:-window]
+    return out
+
+
+def rolling_corr_beta(returns, benchmark, window):
+    """
+    Rolling correlation and beta of `returns` against `benchmark` over `window` bars.
+
+    A value needs `window` bars where both have a return; NaN otherwise.
+    beta = cov(r, b) / var(b), the usual CAPM slope.
+    """
+    both = ~np.isnan(returns) & ~np.isnan(benchmark)
+    x = np.where(both, returns, 0.0)
+    y = np.where(both, benchmark, 0.0)
+
+    n = _rolling_sum(both.astype(float), window)
+    sx, sy = _rolling_sum(x, window), _rolling_sum(y, window)
+    sxx, syy, sxy = _rolling_sum(x * x, window), _rolling_sum(y * y, window), _rolling_sum(x * y, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        corr = cov / np.sqrt(var_x * var_y)
+        beta = cov / var_y
+    incomplete = n < window
+    corr[incomplete] = np.nan
+    beta[incomplete] = np.nan
+    return np.clip(corr, -1.0, 1.0), beta
+
+
+def correlation_matrix(matrix, min_periods=20):
+    """
+    Pairwise-complete Pearson correlation of the columns of a (days, tickers) array.
+
+    Done with four matrix products instead of a Python loop over pairs; cells with
+    fewer than min_periods shared days are NaN.
+    """
+    valid = ~np.isnan(matrix)
+    m = valid.astype(float)
+    x = np.where(valid, matrix, 0.0)
+
+    n = m.T @ m          # shared days per pair
+    sx = x.T @ m         # sx[i, j]: sum of ticker i over days both i and j traded
+    sxx = (x * x).T @ m
+    sxy = x.T @ x
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        var_i = sxx - sx * sx / n
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[n < min_periods] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(np.diag(n) >= min_periods, 1.0, np.nan))
+    return corr, n
+
+
+def drawdown_stats(days, log_returns):
+    """
+    Drawdown of the cumulative return path exp(cumsum(log_return)).
+
+    Returns the max drawdown with its peak/trough/recovery dates (recovery None if
+    the path hasn't regained the peak), the current drawdown and the drawdown series.
+    Days without a return carry the path flat.
+    """
+    if not len(log_returns) or np.isnan(log_returns).all():
+        return None
+    wealth = np.exp(np.cumsum(np.nan_to_num(log_returns)))
+    peaks = np.maximum.accumulate(wealth)
+    drawdown = wealth / peaks - 1
+
+    trough = int(np.argmin(drawdown))
+    peak = int(np.argmax(wealth[:trough + 1]))
+    recovered = np.flatnonzero(wealth[trough:] >= wealth[peak])
+    return {
+        "max_drawdown": float(drawdown[trough]),
+        "peak": _iso(days[peak]),
+        "trough": _iso(days[trough]),
+        "recovery": _iso(days[trough + recovered[0]]) if len(recovered) else None,
+        "current_drawdown": float(drawdown[-1]),
+        "total_return": float(wealth[-1] - 1),
+        "series": drawdown,
+    }
+
+
+def _iso(day):
+    """int32 days since 1970-01-01 -> 'YYYY-MM-DD'."""
+    return str(np.datetime64(int(day), "D"))
+
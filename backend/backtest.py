@@ -0,0 +1,284 @@
+"""
+Vectorized rule-based backtests over the stored factors (/api/backtest).
+
+A strategy turns (dates, tickers) factor arrays into a 0/1 long position array with
+a handful of NumPy operations, so the whole universe is simulated at once:
+
+- rsi: buy when rsi_14 falls below `lower`, sell when it rises above `upper`
+- bollinger: `reversion` buys a close below the lower band, `breakout` a close above
+  the upper band; both sell when the close crosses back over sma_20
+- sma_cross: long while the `fast`-day SMA of the close is above the `slow`-day SMA
+
+Signals use a day's close and are traded at the next close, so positions lag one
+bar and there is no look-ahead. Each day the portfolio holds the tickers with a
+position in equal weights and the rest in cash; `cost_bps` is charged on turnover.
+
+A parameter sweep is the cartesian product of comma-separated values. It is split
+into one chunk per process of BacktestPool, and each process memory-maps the factor
+panel itself, so only parameters and results cross process boundaries.
+"""
+import asyncio
+import itertools
+import logging
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+import numpy as np
+
+from panel import FactorPanel
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+MAX_COMBOS = 1000
+MAX_COST_BPS = 1000
+
+
+def _hold(entries, exits):
+    """1 from an entry until the next exit (an exit wins a tie), else 0; along axis 0."""
+    state = np.where(exits, 0.0, np.where(entries, 1.0, np.nan))
+    rows = np.arange(len(state))[:, None]
+    last = np.where(np.isnan(state), 0, rows)
+    np.maximum.accumulate(last, axis=0, out=last)
+    held = np.take_along_axis(state, last, axis=0)
+    return np.nan_to_num(held, nan=0.0)
+
+
+def _rolling_mean(values, window):
+    """Trailing mean over `window` bars; NaN until a ticker has that many closes."""
+    valid = ~np.isnan(values)
+    csum = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    total, n = csum.copy(), count.copy()
+    total[window:] -= csum[:-window]
+    n[window:] -= count[:-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n == window, total / n, np.nan)
+
+
+def rsi_signal(data, lower, upper):
+    rsi = data["rsi_14"]
+    return _hold(rsi < lower, rsi > upper)
+
+
+def bollinger_signal(data, mode):
+    close, sma = data["close"], data["sma_20"]
+    if mode == "reversion":
+        return _hold(close < data["bollinger_lower"], close > sma)
+    return _hold(close > data["bollinger_upper"], close < sma)
+
+
+def sma_cross_signal(data, fast, slow):
+    close = data["close"]
+    with np.errstate(invalid="ignore"):
+        return (_rolling_mean(close, fast) > _rolling_mean(close, slow)).astype(float)
+
+
+# name -> (signal, factor fields it reads, {param: (type, default, allowed)}); allowed is
+# an inclusive (min, max) range for numbers or a tuple of choices for strings
+STRATEGIES = {
+    "rsi": (rsi_signal, ["rsi_14"], {
+        "lower": (float, 30.0, (0, 100)),
+        "upper": (float, 70.0, (0, 100)),
+    }),
+    "bollinger": (bollinger_signal, ["close", "sma_20", "bollinger_upper", "bollinger_lower"], {
+        "mode": (str, "reversion", ("reversion", "breakout")),
+    }),
+    "sma_cross": (sma_cross_signal, ["close"], {
+        "fast": (int, 20, (2, 250)),
+        "slow": (int, 50, (3, 500)),
+    }),
+}
+
+
+# Combinations a sweep leaves out rather than rejecting the whole grid
+CONSTRAINTS = {
+    "rsi": lambda p: p["lower"] < p["upper"],
+    "sma_cross": lambda p: p["fast"] < p["slow"],
+}
+
+
+def strategy_fields(strategy):
+    """Panel fields a strategy run needs: its signal inputs plus log_return for P&L."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Valid: {', '.join(STRATEGIES)}")
+    return list(dict.fromkeys(["close", "log_return", *STRATEGIES[strategy][1]]))
+
+
+def _param_value(strategy, name, raw):
+    kind, _, allowed = STRATEGIES[strategy][2][name]
+    try:
+        value = kind(raw.strip().lower() if kind is str else raw)
+    except ValueError:
+        raise ValueError(f"Invalid value '{raw}' for {strategy} parameter '{name}'")
+    if kind is str:
+        if value not in allowed:
+            raise ValueError(f"{strategy} parameter '{name}' must be one of {', '.join(allowed)}")
+    elif not allowed[0] <= value <= allowed[1]:
+        raise ValueError(f"{strategy} parameter '{name}' must be between {allowed[0]} and {allowed[1]}")
+    return value
+
+
+def parse_params(strategy, params):
+    """
+    ['lower=20,25,30', 'upper=70'] -> every valid combination as a list of dicts.
+
+    Parameters left out take the strategy's default.
+    """
+    spec = STRATEGIES[strategy][2]
+    grid = {name: [default] for name, (_, default, _) in spec.items()}
+    for item in params:
+        name, sep, values = item.partition("=")
+        name = name.strip().lower()
+        if not sep or name not in spec:
+            raise ValueError(f"Bad parameter '{item}'. {strategy} takes: {', '.join(spec)}")
+        grid[name] = list(dict.fromkeys(_param_value(strategy, name, v) for v in values.split(",") if v.strip()))
+        if not grid[name]:
+            raise ValueError(f"No values for {strategy} parameter '{name}'")
+
+    n_combos = math.prod(len(values) for values in grid.values())
+    if n_combos > MAX_COMBOS:
+        raise ValueError(f"{n_combos} parameter combinations; at most {MAX_COMBOS} per sweep")
+    valid = CONSTRAINTS.get(strategy, lambda p: True)
+    combos = [c for c in (dict(zip(grid, values)) for values in itertools.product(*grid.values())) if valid(c)]
+    if not combos:
+        raise ValueError(f"No valid {strategy} parameter combination (check lower < upper, fast < slow)")
+    return combos
+
+
+def simulate(position, log_returns, cost_bps=0.0):
+    """
+    Equal-weight long/cash portfolio of a (dates, tickers) 0/1 position array.
+
+    Returns (equity curve, stats). Turnover is the sum of absolute weight changes,
+    reported as an annual average (2.0 = the book turned over once a year, in and out).
+    """
+    held = np.zeros_like(position)
+    held[1:] = position[:-1]
+    # No bar that day: the position is carried at a flat price
+    returns = np.expm1(np.nan_to_num(log_returns, nan=0.0))
+
+    n_held = held.sum(axis=1)
+    weights = held / np.maximum(n_held, 1)[:, None]
+    turnover = np.abs(np.diff(weights, axis=0, prepend=0.0)).sum(axis=1)
+    daily = (weights * returns).sum(axis=1) - turnover * cost_bps / 1e4
+
+    equity = np.cumprod(1.0 + daily)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    years = len(daily) / TRADING_DAYS
+    std = daily.std(ddof=1) if len(daily) > 1 else 0.0
+    stats = {
+        "total_return": float(equity[-1] - 1.0),
+        "annual_return": float(equity[-1] ** (1 / years) - 1.0) if equity[-1] > 0 else -1.0,
+        "annual_volatility": float(std * math.sqrt(TRADING_DAYS)),
+        "sharpe": float(daily.mean() / std * math.sqrt(TRADING_DAYS)) if std > 0 else None,
+        "max_drawdown": float(drawdown.min()),
+        "annual_turnover": float(turnover.mean() * TRADING_DAYS),
+        "exposure": float((n_held > 0).mean()),
+        "avg_positions": float(n_held.mean()),
+        "trades": int((np.diff(held, axis=0) > 0).sum() + held[0].sum()),
+    }
+    # e.g. annual_return overflows when a few days are annualized; JSON has no inf
+    return equity, {k: None if isinstance(v, float) and not math.isfinite(v) else v for k, v in stats.items()}
+
+
+@lru_cache(maxsize=2)
+def _open_panel(directory):
+    return FactorPanel(directory)
+
+
+def load_source(source):
+    """
+    (days, tickers, {field: (dates, tickers) array}) for a source built by the API:
+    {"panel": directory, "tickers": [...] or None, "start", "end", "fields"} reads the
+    factor panel, {"days", "tickers", "values"} carries arrays already loaded from SQL.
+    Days on which none of the tickers traded are dropped.
+    """
+    if "panel" in source:
+        panel = _open_panel(source["panel"])
+        tickers = source["tickers"] or list(panel.tickers)
+        values = {}
+        for field in source["fields"]:
+            days, values[field] = panel.slice(field, source["tickers"], source["start"], source["end"])
+    else:
+        days, tickers, values = source["days"], source["tickers"], source["values"]
+    traded = ~np.isnan(values["close"]).all(axis=1)
+    return days[traded], tickers, {f: np.asarray(v[traded], dtype=np.float64) for f, v in values.items()}
+
+
+def run_backtests(source, strategy, combos, cost_bps=0.0, curves=True):
+    """Run every parameter combination over one source; the unit of work of a sweep process."""
+    days, tickers, data = load_source(source)
+    if not len(days):
+        raise ValueError("No factor data for these tickers and dates")
+    signal = STRATEGIES[strategy][0]
+    results = []
+    for params in combos:
+        equity, stats = simulate(signal(data, **params), data["log_return"], cost_bps)
+        result = {"params": params, "stats": stats}
+        if curves:
+            result["equity"] = equity
+        results.append(result)
+    return days, tickers, results
+
+
+class BacktestPool:
+    """
+    Processes that run parameter sweeps off the event loop.
+
+    Created lazily on the first sweep (spawned, not forked: the API process runs
+    threads). A single combination runs on a thread instead, as a process round trip
+    would cost more than the backtest.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(4, multiprocessing.cpu_count())
+        self._executor = None
+        self._sweeps_total = 0
+        self._combos_total = 0
+        self._broken_total = 0
+
+    async def run(self, source, strategy, combos, cost_bps=0.0, curves=True):
+        self._sweeps_total += 1
+        self._combos_total += len(combos)
+        if len(combos) == 1 or self.max_workers < 2:
+            return await asyncio.to_thread(run_backtests, source, strategy, combos, cost_bps, curves)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        executor = self._executor
+        size = math.ceil(len(combos) / self.max_workers)
+        loop = asyncio.get_running_loop()
+        try:
+            chunks = await asyncio.gather(*[
+                loop.run_in_executor(executor, run_backtests, source, strategy, combos[i:i + size], cost_bps, curves)
+                for i in range(0, len(combos), size)
+            ])
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); the pool refuses all further work, so the
+            # next sweep starts a fresh one. Concurrent sweeps may have replaced it already.
+            logger.warning("Backtest process pool broke - it will be restarted on the next sweep")
+            self._broken_total += 1
+            executor.shutdown(wait=False, cancel_futures=True)
+            if self._executor is executor:
+                self._executor = None
+            raise
+        days, tickers, _ = chunks[0]
+        return days, tickers, [result for _, _, results in chunks for result in results]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "started": self._executor is not None,
+            "sweeps_total": self._sweeps_total,
+            "combos_total": self._combos_total,
+            "broken_total": self._broken_total,
+        }
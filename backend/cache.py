@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """In-process LRU of serialized responses, bounded by total bytes and per-entry TTL."""
+
+    def __init__(self, max_bytes=64 * 2**20, ttl=3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._evict(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    async def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._bytes += len(value)
+        # Evict least recently used entries until we're back under budget
+        while self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    async def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _evict(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class RedisCache:
+    """Same interface backed by a Redis-compatible server, shared by every worker."""
+
+    def __init__(self, url, ttl=3600, prefix="quant:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key):
+        value = await self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key, value):
+        await self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    async def clear(self):
+        # Shared by every worker, so a namespace-wide delete would also drop entries other
+        # workers just wrote under the new version. Keys embed the data version, so stale
+        # entries are unreachable and simply expire with their TTL.
+        pass
+
+    def stats(self):
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+
+def create_cache():
+    """Pick the backend from CACHE_BACKEND (memory | redis)."""
+    ttl = int(os.getenv("CACHE_TTL_SECONDS", "3600"))
+    if os.getenv("CACHE_BACKEND", "memory") == "redis":
+        try:
+            return RedisCache(os.getenv("REDIS_URL", "redis://localhost:6379/0"), ttl=ttl)
+        except ImportError:
+            logger.warning("CACHE_BACKEND=redis but the redis package is not installed - using memory cache")
+    return MemoryCache(max_bytes=int(os.getenv("CACHE_MAX_MB", "64")) * 2**20, ttl=ttl)
+
+
+class DataVersion:
+    """
+    Tracks the data_version stamp that the pipeline bumps in system.state.
+
+    The stamp is polled in the background, so serving a cached response never touches
+    the database. When it changes, every cache key (which embeds the version) changes
+    with it; the in-process cache drops its old entries, Redis lets them expire.
+    """
+
+    QUERY = "SELECT value_text FROM system.state WHERE key = 'data_version'"
+
+    def __init__(self, pool, cache, interval=30):
+        self.pool = pool
+        self.cache = cache
+        self.interval = interval
+        self.value = "0"
+        self._task = None
+
+    async def start(self):
+        await self.refresh()
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def refresh(self):
+        row = await self.pool.fetchone(self.QUERY)
+        value = row[0] if row else "0"
+        if value != self.value:
+            logger.info(f"Data version changed {self.value} -> {value}, clearing response cache")
+            self.value = value
+            await self.cache.clear()
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Data version refresh failed: {e}")
+
+    def etag(self, key):
+        digest = hashlib.sha1(f"{self.value}:{key}".encode()).hexdigest()[:20]
+        return f'"{digest}"'
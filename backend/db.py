@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the acquire timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of psycopg2 connections shared by every request handler.
+
+    Connections are opened lazily up to max_size and handed back for reuse, so a
+    request no longer pays the TCP + auth handshake. psycopg2 is a blocking driver,
+    so every query runs on a dedicated thread pool (one thread per connection)
+    and the event loop stays free while Postgres works.
+    """
+
+    def __init__(self, dsn, min_size=2, max_size=10, acquire_timeout=5.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool bounds: min_size={min_size}, max_size={max_size}")
+
+        # Psycopg2 requires 'postgresql://', but SQLAlchemy sometimes uses 'postgresql+psycopg2://'
+        self.dsn = dsn.replace("postgresql+psycopg2://", "postgresql://")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._cond = None
+        self._executor = None
+        self._closed = True
+
+        # Counters for the stats endpoint
+        self._acquired_total = 0
+        self._timeouts_total = 0
+        self._acquire_seconds_total = 0.0
+        self._acquire_seconds_max = 0.0
+
+    # --- Lifecycle ---
+    async def open(self):
+        self._cond = asyncio.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_size, thread_name_prefix="db")
+        self._closed = False
+
+        # Pre-warm min_size connections so the first requests don't pay the handshake
+        for _ in range(self.min_size):
+            conn = await self._run(self._connect)
+            self._idle.append(conn)
+            self._size += 1
+
+        logger.info(f"Database pool opened (min={self.min_size}, max={self.max_size})")
+
+    async def close(self):
+        self._closed = True
+        while self._idle:
+            conn = self._idle.popleft()
+            conn.close()
+            self._size -= 1
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        logger.info("Database pool closed")
+
+    # --- Acquire / release ---
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self._acquire()
+        try:
+            yield conn
+        finally:
+            await self._release(conn)
+
+    async def _acquire(self):
+        if self._closed:
+            raise RuntimeError("Database pool is not open")
+
+        started = time.perf_counter()
+        async with self._cond:
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self._idle or self._size < self.max_size),
+                    timeout=self.acquire_timeout,
+                )
+            except asyncio.TimeoutError:
+                self._timeouts_total += 1
+                raise PoolTimeout(
+                    f"Timed out after {self.acquire_timeout}s waiting for a database connection"
+                )
+            finally:
+                self._waiting -= 1
+
+            if self._idle:
+                conn = self._idle.popleft()
+            else:
+                # Reserve the slot before connecting so concurrent waiters can't overshoot max_size
+                self._size += 1
+                conn = None
+
+        if conn is None or conn.closed:
+            try:
+                conn = await self._run(self._connect)
+            except Exception:
+                async with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        elapsed = time.perf_counter() - started
+        self._acquired_total += 1
+        self._acquire_seconds_total += elapsed
+        self._acquire_seconds_max = max(self._acquire_seconds_max, elapsed)
+        return conn
+
+    async def _release(self, conn):
+        async with self._cond:
+            # Broken connections are dropped and their slot handed to the next waiter
+            if conn.closed or self._closed:
+                if not conn.closed:
+                    conn.close()
+                self._size -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    # --- Queries ---
+    async def fetch(self, query, params=None):
+        """Run a read query and return all rows as tuples."""
+        async with self.connection() as conn:
+            return await self._run(self._execute, conn, query, params, "all")
+
+    async def fetchone(self, query, params=None):
+        async with self.connection() as conn:
+            return await self._run(self._execute, conn, query, params, "one")
+
+    async def execute(self, query, params=None):
+        async with self.connection() as conn:
+            return await self._run(self._execute, conn, query, params, None)
+
+    def stats(self):
+        acquired = self._acquired_total
+        return {
+            "size": self._size,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "idle": len(self._idle),
+            "in_use": self._size - len(self._idle),
+            "waiting": self._waiting,
+            "acquired_total": acquired,
+            "timeouts_total": self._timeouts_total,
+            "acquire_ms_avg": round(self._acquire_seconds_total / acquired * 1000, 3) if acquired else 0.0,
+            "acquire_ms_max": round(self._acquire_seconds_max * 1000, 3),
+        }
+
+    # --- Internals (run on the executor threads) ---
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        # Read-only API traffic: autocommit avoids leaving connections idle in transaction
+        conn.autocommit = True
+        return conn
+
+    @staticmethod
+    def _execute(conn, query, params, mode):
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                if mode == "all":
+                    return cur.fetchall()
+                if mode == "one":
+                    return cur.fetchone()
+                return cur.rowcount
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Lost connection: close it so _release discards it instead of recycling it
+            conn.close()
+            raise
@@ -0,0 +1,334 @@
+"""
+Intraday bars kept in memory and pushed to the dashboard over Server-Sent Events.
+
+A feed yields bar updates (ticker, time, open, high, low, close, volume). An update
+with the same time as a ticker's last bar revises that bar (the minute is still
+forming); a later time closes it and starts a new one. Each update refreshes the
+indicators in O(1) from running window sums. The formulas are the batch ones from
+airflow/scripts/indicators.py: sample std, 2-sigma Bollinger bands, a 14-bar
+simple-average RSI and 20-bar volatility scaled by sqrt(252). Here they run over
+intraday bars rather than days.
+
+Feeds:
+- ReplayFeed        recorded bars from a CSV, replayed at a chosen speed (offline runs)
+- YFinancePollFeed  polls yfinance 1-minute bars for the tickers clients watch
+
+INTRADAY_FEED selects one (off | yfinance | replay:/path/bars.csv); off by default.
+"""
+import asyncio
+import csv
+import logging
+import math
+import os
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SMA_WINDOW = 20
+VOL_WINDOW = 20
+RSI_PERIOD = 14
+TRADING_DAYS = 252
+
+# Running sums pick up round-off with every add/remove; re-sum exactly this often
+RESUM_EVERY = 1000
+
+
+class RollingWindow:
+    """Last `size` values with O(1) push / replace-last and running sum, sum of squares and counts."""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.base = None  # values are centred on the first one seen, as in indicators.rolling_std
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.valid = 0
+        self.positive = 0
+        self._updates = 0
+
+    def push(self, value):
+        self.values.append(value)
+        self._add(value)
+        if len(self.values) > self.size:
+            self._remove(self.values.popleft())
+        self._tick()
+
+    def replace_last(self, value):
+        self._remove(self.values[-1])
+        self.values[-1] = value
+        self._add(value)
+        self._tick()
+
+    def _add(self, value):
+        if math.isnan(value):
+            return
+        if self.base is None:
+            self.base = value
+        x = value - self.base
+        self.sum += x
+        self.sumsq += x * x
+        self.valid += 1
+        self.positive += value > 0
+
+    def _remove(self, value):
+        if math.isnan(value):
+            return
+        x = value - self.base
+        self.sum -= x
+        self.sumsq -= x * x
+        self.valid -= 1
+        self.positive -= value > 0
+
+    def _tick(self):
+        self._updates += 1
+        if self._updates % RESUM_EVERY == 0:
+            valid = [v - self.base for v in self.values if not math.isnan(v)]
+            self.sum = math.fsum(valid)
+            self.sumsq = math.fsum(x * x for x in valid)
+
+    @property
+    def full(self):
+        """True once the window holds `size` valid values (pandas' min_periods=window)."""
+        return self.valid == self.size
+
+    def mean(self):
+        return self.base + self.sum / self.size if self.full else math.nan
+
+    def std(self):
+        """Sample (ddof=1) standard deviation."""
+        if not self.full:
+            return math.nan
+        var = (self.sumsq - self.sum * self.sum / self.size) / (self.size - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class TickerIndicators:
+    """Indicator state for one ticker's bar stream."""
+
+    def __init__(self):
+        self.closes = RollingWindow(SMA_WINDOW)
+        self.log_returns = RollingWindow(VOL_WINDOW)
+        self.gains = RollingWindow(RSI_PERIOD)
+        self.losses = RollingWindow(RSI_PERIOD)
+        self.prev_close = None  # close of the bar before the one forming now
+
+    def update(self, close, new_bar):
+        """Apply a bar's close: push for a new bar, replace-last for a revision. Returns the factors."""
+        if new_bar:
+            if self.closes.values:
+                self.prev_close = self.closes.values[-1]
+            op = "push"
+        else:
+            op = "replace_last"
+
+        if self.prev_close is None:
+            # First bar: no return yet; its (missing) move counts as zero for RSI, like the batch code
+            ratio, delta = math.nan, 0.0
+        else:
+            ratio, delta = close / self.prev_close, close - self.prev_close
+        log_return = math.log(ratio) if ratio > 0 else math.nan
+
+        getattr(self.closes, op)(close)
+        getattr(self.log_returns, op)(log_return)
+        getattr(self.gains, op)(max(delta, 0.0))
+        getattr(self.losses, op)(max(-delta, 0.0))
+        return self.factors(ratio, log_return)
+
+    def factors(self, ratio, log_return):
+        sma = self.closes.mean()
+        std = self.closes.std()
+        return {
+            "sma_20": sma,
+            "daily_return": ratio - 1,
+            "bollinger_upper": sma + std * 2,
+            "bollinger_lower": sma - std * 2,
+            "log_return": log_return,
+            "volatility_20d": self.log_returns.std() * math.sqrt(TRADING_DAYS),
+            "rsi_14": self.rsi(),
+        }
+
+    def rsi(self):
+        if not self.gains.full:
+            return math.nan
+        # A window with no up (down) moves is exactly zero, not running-sum round-off
+        avg_gain = self.gains.mean() if self.gains.positive else 0.0
+        avg_loss = self.losses.mean() if self.losses.positive else 0.0
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else math.nan
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+class IntradayHub:
+    """
+    In-memory bars per ticker plus the SSE subscribers that want them.
+
+    Each subscriber owns a bounded queue. One that falls max_queue events behind
+    is dropped rather than holding back the feed; EventSource reconnects and gets
+    a fresh snapshot.
+    """
+
+    def __init__(self, max_bars=2000, max_queue=1000):
+        self.max_bars = max_bars
+        self.max_queue = max_queue
+        self.bars = {}        # ticker -> deque of bar dicts (with factors), oldest first
+        self.indicators = {}  # ticker -> TickerIndicators
+        self.subscribers = {}  # queue -> set of tickers
+        self.updates = 0
+
+    def apply(self, ticker, bar):
+        """Fold one bar update into the ticker's series and fan the delta out. Returns the stored bar."""
+        bars = self.bars.setdefault(ticker, deque(maxlen=self.max_bars))
+        state = self.indicators.setdefault(ticker, TickerIndicators())
+
+        if bars and bar["time"] < bars[-1]["time"]:
+            return None  # late update for a closed bar
+        new_bar = not bars or bar["time"] > bars[-1]["time"]
+        row = {**bar, **state.update(float(bar["close"]), new_bar)}
+        if new_bar:
+            bars.append(row)
+        else:
+            bars[-1] = row
+
+        self.updates += 1
+        self.publish(ticker, row)
+        return row
+
+    def snapshot(self, ticker, limit=None):
+        bars = list(self.bars.get(ticker, ()))
+        return bars[-limit:] if limit else bars
+
+    def subscribe(self, tickers):
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self.subscribers[queue] = set(tickers)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.pop(queue, None)
+
+    def watched(self):
+        return set().union(*self.subscribers.values()) if self.subscribers else set()
+
+    def publish(self, ticker, row):
+        for queue, tickers in list(self.subscribers.items()):
+            if ticker not in tickers:
+                continue
+            try:
+                queue.put_nowait((ticker, row))
+            except asyncio.QueueFull:
+                logger.warning("Dropping a lagging intraday subscriber")
+                self.unsubscribe(queue)
+
+    def stats(self):
+        return {
+            "tickers": len(self.bars),
+            "bars": sum(len(b) for b in self.bars.values()),
+            "subscribers": len(self.subscribers),
+            "updates": self.updates,
+        }
+
+    async def run(self, feed):
+        """Consume a feed until it ends or the task is cancelled."""
+        async for ticker, bar in feed.updates(self):
+            self.apply(ticker, bar)
+
+
+def json_bar(row):
+    """Bar dict -> JSON-safe dict (NaN during indicator warm-up becomes null)."""
+    return {k: None if isinstance(v, float) and math.isnan(v) else v for k, v in row.items()}
+
+
+# --- Feeds ---
+class ReplayFeed:
+    """
+    Bar updates from a recorded CSV (time, ticker, open, high, low, close, volume), in file order.
+
+    `speed` scales the recorded gaps between distinct timestamps (60 = one recorded
+    minute per second); 0 replays as fast as possible.
+    """
+
+    def __init__(self, path, speed=60.0, loop=False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+
+    def read(self):
+        with open(self.path, newline="") as f:
+            for row in csv.DictReader(f):
+                yield row["ticker"].upper(), {
+                    "time": datetime.fromisoformat(row["time"]).isoformat(),
+                    "open": float(row["open"]),
+                    "high": float(row["high"]),
+                    "low": float(row["low"]),
+                    "close": float(row["close"]),
+                    "volume": int(float(row["volume"] or 0)),
+                }
+
+    async def updates(self, hub):
+        while True:
+            previous = None
+            for ticker, bar in self.read():
+                if self.speed and previous and bar["time"] > previous:
+                    gap = (datetime.fromisoformat(bar["time"]) - datetime.fromisoformat(previous)).total_seconds()
+                    await asyncio.sleep(gap / self.speed)
+                previous = bar["time"]
+                yield ticker, bar
+            if not self.loop:
+                return
+
+
+class YFinancePollFeed:
+    """Polls yfinance for today's 1-minute bars of every ticker a client is watching."""
+
+    def __init__(self, interval=15.0):
+        self.interval = interval
+
+    def fetch(self, tickers):
+        import yfinance as yf
+
+        raw = yf.download(sorted(tickers), period="1d", interval="1m", group_by="ticker",
+                          auto_adjust=False, progress=False, threads=False)
+        updates = []
+        for ticker in tickers:
+            try:
+                frame = raw[ticker] if raw.columns.nlevels > 1 else raw
+            except KeyError:
+                continue
+            for ts, r in frame.dropna(subset=["Close"]).tail(5).iterrows():
+                updates.append((ticker, {
+                    "time": ts.isoformat(),
+                    "open": float(r["Open"]),
+                    "high": float(r["High"]),
+                    "low": float(r["Low"]),
+                    "close": float(r["Close"]),
+                    "volume": int(r["Volume"]) if r["Volume"] == r["Volume"] else 0,
+                }))
+        return updates
+
+    async def updates(self, hub):
+        while True:
+            tickers = hub.watched()
+            if tickers:
+                try:
+                    # yfinance is blocking; keep it off the event loop
+                    for update in await asyncio.to_thread(self.fetch, tickers):
+                        yield update
+                except Exception as e:
+                    logger.warning(f"Intraday poll failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+def create_feed():
+    """Feed from INTRADAY_FEED (off | yfinance | replay:/path/bars.csv); None when off."""
+    spec = os.getenv("INTRADAY_FEED", "off")
+    if spec == "off":
+        return None
+    if spec == "yfinance":
+        return YFinancePollFeed(interval=float(os.getenv("INTRADAY_POLL_SECONDS", "15")))
+    if spec.startswith("replay:"):
+        return ReplayFeed(
+            spec.split(":", 1)[1],
+            speed=float(os.getenv("INTRADAY_REPLAY_SPEED", "60")),
+            loop=os.getenv("INTRADAY_REPLAY_LOOP", "false").lower() == "true",
+        )
+    raise ValueError(f"Unknown INTRADAY_FEED: {spec}")
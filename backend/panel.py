@@ -0,0 +1,119 @@
+"""
+Read-only access to the factor panel that calculate_factors publishes.
+
+Layout (see airflow/scripts/factor_panel.py): FACTOR_PANEL_DIR/CURRENT names the live
+v<data_version> directory holding values.npy (fields, dates, tickers), dates.npy,
+tickers.json and manifest.json. values.npy is memory-mapped, so opening the panel
+costs nothing and a field or date-range slice is a view over the page cache.
+
+Offline scripts can use it too:
+
+    from panel import FactorPanel
+    panel = FactorPanel.open("/data/factor_panel")
+    days, returns = panel.slice("log_return", start=date(2024, 1, 1))
+"""
+import json
+import logging
+import os
+from datetime import date
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class FactorPanel:
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(directory, "tickers.json")) as f:
+            self.tickers = json.load(f)
+        self.values = np.load(os.path.join(directory, "values.npy"), mmap_mode="r")
+        self.dates = np.load(os.path.join(directory, "dates.npy"))
+        self.fields = self.manifest["fields"]
+        self.data_version = self.manifest["data_version"]
+        self._field_index = {f: i for i, f in enumerate(self.fields)}
+        self._ticker_index = {t: i for i, t in enumerate(self.tickers)}
+
+    @classmethod
+    def open(cls, root):
+        """Open the version CURRENT points at; None if nothing has been published."""
+        try:
+            with open(os.path.join(root, "CURRENT")) as f:
+                name = f.read().strip()
+            return cls(os.path.join(root, name))
+        except FileNotFoundError:
+            return None
+
+    def field(self, name):
+        """(dates, tickers) view of one field; no copy."""
+        if name not in self._field_index:
+            raise ValueError(f"Unknown panel field '{name}'. Valid: {', '.join(self.fields)}")
+        return self.values[self._field_index[name]]
+
+    def date_range(self, start=None, end=None):
+        """Slice bounds of the dates between start and end (inclusive)."""
+        lo = np.searchsorted(self.dates, start.toordinal() - EPOCH_ORDINAL) if start else 0
+        hi = np.searchsorted(self.dates, end.toordinal() - EPOCH_ORDINAL, side="right") if end else len(self.dates)
+        return lo, hi
+
+    def has_tickers(self, tickers):
+        return all(t in self._ticker_index for t in tickers)
+
+    def slice(self, field, tickers=None, start=None, end=None):
+        """
+        (days, values) for a field over a date range.
+
+        All tickers (tickers=None) is a zero-copy view; picking tickers gathers columns
+        into a new array.
+        """
+        lo, hi = self.date_range(start, end)
+        values = self.field(field)[lo:hi]
+        if tickers is not None:
+            values = values[:, [self._ticker_index[t] for t in tickers]]
+        return self.dates[lo:hi], values
+
+    def stats(self):
+        return {
+            "directory": self.directory,
+            "data_version": self.data_version,
+            "shape": list(self.values.shape),
+            "fields": self.fields,
+            "first_date": str(np.datetime64(int(self.dates[0]), "D")) if len(self.dates) else None,
+            "last_date": str(np.datetime64(int(self.dates[-1]), "D")) if len(self.dates) else None,
+            "created_at": self.manifest.get("created_at"),
+        }
+
+
+class PanelStore:
+    """Holds the open panel and re-opens it when the pipeline publishes a new one."""
+
+    def __init__(self, root):
+        self.root = root
+        self.panel = None
+        self._current = None
+
+    def get(self, data_version=None):
+        """
+        The current panel, or None if there is none or it is for another data version
+        (callers then fall back to SQL).
+        """
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if name != self._current:
+            try:
+                self.panel = FactorPanel(os.path.join(self.root, name))
+                self._current = name
+                logger.info(f"Opened factor panel {name} {self.panel.values.shape}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not open factor panel {name}: {e}")
+                return None
+        if data_version is not None and self.panel.data_version != str(data_version):
+            return None
+        return self.panel
@@ -0,0 +1,87 @@
+"""
+Prometheus text exposition of the pipeline timings in system.pipeline_metrics.
+
+The Airflow tasks record wall time, rows and peak RSS per stage and step
+(airflow/scripts/metrics.py). Only the latest run of each stage is exposed, as
+gauges with a `shard` label for the per-shard tasks of the sharded DAG, so a scrape
+reflects the most recent DAG run; history stays in the table for ad-hoc queries
+and the benchmark harness.
+"""
+import math
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# A retried task records again under the same run id; its newest attempt wins
+LATEST_METRICS_SQL = """
+    WITH latest AS (
+        SELECT DISTINCT ON (stage) stage, run_id
+        FROM system.pipeline_metrics
+        ORDER BY stage, started_at DESC
+    )
+    SELECT DISTINCT ON (m.stage, m.step, m.shard)
+        m.stage, m.step, m.shard, m.status, m.started_at, m.seconds, m.rows, m.peak_rss_mb
+    FROM system.pipeline_metrics m
+    JOIN latest USING (stage, run_id)
+    ORDER BY m.stage, m.step, m.shard, m.started_at DESC
+"""
+
+COLUMNS = ("stage", "step", "shard", "status", "started_at", "seconds", "rows", "peak_rss_mb")
+
+# name -> (help, value from a row dict)
+GAUGES = {
+    "quant_pipeline_step_duration_seconds": (
+        "Wall time of the latest run of a pipeline stage step",
+        lambda r: r["seconds"],
+    ),
+    "quant_pipeline_step_rows": (
+        "Rows processed by the latest run of a pipeline stage step",
+        lambda r: r["rows"],
+    ),
+    "quant_pipeline_step_rows_per_second": (
+        "Throughput of the latest run of a pipeline stage step",
+        lambda r: r["rows"] / r["seconds"] if r["rows"] is not None and r["seconds"] else None,
+    ),
+    "quant_pipeline_step_peak_rss_bytes": (
+        "Task peak resident memory when the step finished",
+        lambda r: r["peak_rss_mb"] * 2**20 if r["peak_rss_mb"] is not None else None,
+    ),
+    "quant_pipeline_step_last_run_timestamp_seconds": (
+        "Start time of the latest run of a pipeline stage step",
+        lambda r: r["started_at"].timestamp(),
+    ),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items() if v is not None) + "}"
+
+
+def _number(value):
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def render_prometheus(rows):
+    """LATEST_METRICS_SQL rows (see COLUMNS) -> exposition text."""
+    records = [dict(zip(COLUMNS, row)) for row in rows]
+    lines = []
+    for name, (help_text, value) in GAUGES.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for r in records:
+            v = value(r)
+            if v is not None:
+                lines.append(f"{name}{_labels(stage=r['stage'], step=r['step'], shard=r['shard'])} {_number(v)}")
+
+    name = "quant_pipeline_stage_success"
+    lines += [f"# HELP {name} 1 if the latest run of the stage succeeded", f"# TYPE {name} gauge"]
+    for r in records:
+        if r["step"] == "total":
+            lines.append(f"{name}{_labels(stage=r['stage'], shard=r['shard'])} {1 if r['status'] == 'success' else 0}")
+    return "\n".join(lines) + "\n"
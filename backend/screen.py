@@ -0,0 +1,151 @@
+"""
+Query building for the cross-sectional screener (/api/screen).
+
+A screen is a list of predicates over one day's bars, e.g. rsi_14<30 and
+volatility_20d>0.4, plus a sort order and a page. A predicate compares a field with
+a number or with another field (close<bollinger_lower). Field names are checked
+against SCREEN_FIELDS and numbers are bound as parameters, so user input never
+reaches the SQL text.
+
+The latest day reads analytics.factor_snapshot: one row per ticker, refreshed with
+chart_series by the pipeline and indexed on the common screening factors. An
+`as_of` screen picks that day's bars out of analytics.chart_series via its date
+index.
+"""
+import re
+
+# Columns of analytics.factor_snapshot / chart_series a screen can filter, sort or return
+SCREEN_FIELDS = [
+    "open", "high", "low", "close", "volume", "sma_20", "bollinger_upper", "bollinger_lower",
+    "rsi_14", "daily_return", "log_return", "volatility_20d",
+]
+
+OPERATORS = ["<=", ">=", "!=", "<", ">", "="]
+
+PREDICATE_RE = re.compile(r"^\s*([a-z0-9_]+)\s*(<=|>=|!=|<|>|=)\s*(\S+)\s*$")
+
+MAX_PREDICATES = 20
+MAX_SCREEN_LIMIT = 1000
+
+
+def _field(name):
+    name = name.strip().lower()
+    if name not in SCREEN_FIELDS:
+        raise ValueError(f"Unknown screen field '{name}'. Valid: {', '.join(SCREEN_FIELDS)}")
+    return name
+
+
+def parse_screen_fields(fields):
+    """'close,rsi_14' -> ['close', 'rsi_14'] in canonical order; None means every field."""
+    if not fields:
+        return list(SCREEN_FIELDS)
+    requested = {_field(f) for f in fields.split(",") if f.strip()}
+    return [f for f in SCREEN_FIELDS if f in requested]
+
+
+def parse_predicates(where):
+    """
+    ['rsi_14<30', 'close<bollinger_lower,volatility_20d>0.4'] ->
+    [('rsi_14', '<', 30.0), ('close', '<', 'bollinger_lower'), ('volatility_20d', '>', 0.4)].
+
+    Each item may hold several comma-separated predicates; all of them must hold.
+    """
+    predicates = []
+    for item in where or []:
+        for text in item.split(","):
+            if not text.strip():
+                continue
+            match = PREDICATE_RE.match(text.lower())
+            if not match:
+                raise ValueError(f"Bad predicate '{text}'. Expected <field><op><number|field>, op one of {' '.join(OPERATORS)}")
+            field, op, rhs = match.groups()
+            try:
+                value = float(rhs)
+            except ValueError:
+                value = _field(rhs)
+            predicates.append((_field(field), op, value))
+    if len(predicates) > MAX_PREDICATES:
+        raise ValueError(f"At most {MAX_PREDICATES} predicates per screen")
+    return predicates
+
+
+def parse_sort(sort):
+    """'-volatility_20d,rsi_14' -> [('volatility_20d', 'DESC'), ('rsi_14', 'ASC')]; ticker breaks ties."""
+    keys = []
+    for key in (sort or "").split(","):
+        key = key.strip()
+        if not key:
+            continue
+        direction = "DESC" if key.startswith("-") else "ASC"
+        name = key.lstrip("+-").lower()
+        keys.append((name if name == "ticker" else _field(name), direction))
+    return keys
+
+
+def build_screen_query(fields, predicates, sort, as_of=None, tickers=None, limit=100, offset=0):
+    """
+    Return (sql, params) for one page of a screen.
+
+    The query always yields at least one row: (day, total, ticker, *fields), with a
+    NULL ticker when the page is empty, so the resolved date and the match count
+    come back in the same round-trip as the page.
+    """
+    if not 0 < limit <= MAX_SCREEN_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_SCREEN_LIMIT}")
+    if offset < 0:
+        raise ValueError("offset must be >= 0")
+
+    params = {"as_of": as_of, "tickers": tickers, "limit": limit, "offset": offset}
+    if as_of is None:
+        source = "analytics.factor_snapshot"
+        day = "(SELECT MAX(date) FROM analytics.factor_snapshot)"
+    else:
+        # Weekends and holidays resolve to the trading day before
+        source = "analytics.chart_series"
+        day = "(SELECT MAX(date) FROM analytics.chart_series WHERE date <= %(as_of)s)"
+
+    filters = [f"s.date = {day}"]
+    if tickers:
+        filters.append("s.ticker = ANY(%(tickers)s)")
+    for i, (field, op, value) in enumerate(predicates):
+        if isinstance(value, str):
+            filters.append(f"s.{field} {op} s.{value}")
+        else:
+            params[f"p{i}"] = value
+            filters.append(f"s.{field} {op} %(p{i})s")
+
+    order = [f"{name} {direction} NULLS LAST" for name, direction in sort]
+    if not any(name == "ticker" for name, _ in sort):
+        order.append("ticker ASC")
+
+    # Sort keys have to come out of the CTE even when they aren't returned
+    selected = fields + [name for name, _ in sort if name != "ticker" and name not in fields]
+
+    sql = f"""
+        WITH matched AS (
+            SELECT s.ticker, {', '.join(f's.{f}' for f in selected)}
+            FROM {source} s
+            WHERE {' AND '.join(filters)}
+        )
+        SELECT {day} AS day, (SELECT COUNT(*) FROM matched) AS total,
+               p.ticker, {', '.join(f'p.{f}' for f in fields)}
+        FROM (SELECT 1) one
+        LEFT JOIN LATERAL (
+            SELECT * FROM matched
+            ORDER BY {', '.join(order)}
+            LIMIT %(limit)s OFFSET %(offset)s
+        ) p ON true
+    """
+    return sql, params
+
+
+def screen_records(rows, fields):
+    """Rows from build_screen_query -> (day, total, [{"ticker": ..., field: ...}, ...])."""
+    day, total = rows[0][0], rows[0][1]
+    casts = [int if f == "volume" else float for f in fields]
+    data = [
+        {"ticker": r[2], **{f: cast(v) if v is not None else None for f, cast, v in zip(fields, casts, r[3:])}}
+        for r in rows
+        if r[2] is not None
+    ]
+    return day, total, data
@@ -0,0 +1,209 @@
+"""
+Query building and downsampling for price series endpoints.
+
+A series request can narrow the date range (start/end), page with a date cursor,
+project a subset of fields, aggregate to weekly/monthly bars, and reduce the result
+to a target number of points with Largest-Triangle-Three-Buckets (LTTB). Work that
+the chart won't display never leaves the database, or at least never hits the wire.
+
+Everything reads analytics.chart_series, the float8 serving table the pipeline keeps
+pre-joined (see postgres/init.sql), so a range read is an index-only scan on
+(ticker, date) and no NUMERIC -> Decimal conversion happens per value.
+"""
+from datetime import date
+
+import numpy as np
+
+# field -> (daily column, expression when aggregating a period)
+# Indicators take the value at the period's last bar, like a weekly chart would.
+SERIES_FIELDS = {
+    "open": ("c.open", "(ARRAY_AGG(open ORDER BY date))[1]"),
+    "high": ("c.high", "MAX(high)"),
+    "low": ("c.low", "MIN(low)"),
+    "close": ("c.close", "(ARRAY_AGG(close ORDER BY date DESC))[1]"),
+    "volume": ("c.volume", "SUM(volume)"),
+    "sma_20": ("c.sma_20", "(ARRAY_AGG(sma_20 ORDER BY date DESC))[1]"),
+    "bollinger_upper": ("c.bollinger_upper", "(ARRAY_AGG(bollinger_upper ORDER BY date DESC))[1]"),
+    "bollinger_lower": ("c.bollinger_lower", "(ARRAY_AGG(bollinger_lower ORDER BY date DESC))[1]"),
+    "rsi_14": ("c.rsi_14", "(ARRAY_AGG(rsi_14 ORDER BY date DESC))[1]"),
+    "log_return": ("c.log_return", "SUM(log_return)"),
+    "volatility_20d": ("c.volatility_20d", "(ARRAY_AGG(volatility_20d ORDER BY date DESC))[1]"),
+}
+
+RESOLUTIONS = {"daily": None, "weekly": "week", "monthly": "month"}
+
+MAX_LIMIT = 10000
+
+
+def parse_fields(fields):
+    """'close,sma_20' -> ['close', 'sma_20'] in canonical order; None means every field."""
+    if not fields:
+        return list(SERIES_FIELDS)
+    requested = {f.strip().lower() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(SERIES_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Valid: {', '.join(SERIES_FIELDS)}")
+    return [f for f in SERIES_FIELDS if f in requested]
+
+
+def build_series_query(fields, resolution="daily", start=None, end=None, cursor=None, limit=None):
+    """Return (sql, params) selecting `time` plus `fields` for one ticker (%(ticker)s)."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{resolution}'. Valid: {', '.join(RESOLUTIONS)}")
+    if limit is not None and not 0 < limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    params = {"start": start, "end": end, "cursor": cursor, "limit": limit}
+    filters = ["c.ticker = %(ticker)s"]
+    if start:
+        filters.append("c.date >= %(start)s")
+    if end:
+        filters.append("c.date <= %(end)s")
+
+    daily = f"""
+        SELECT c.date, {', '.join(f'{SERIES_FIELDS[f][0]} AS {f}' for f in fields)}
+        FROM analytics.chart_series c
+        WHERE {' AND '.join(filters)}
+    """
+
+    period = RESOLUTIONS[resolution]
+    if period is None:
+        series = f"SELECT date AS time, {', '.join(fields)} FROM ({daily}) d"
+    else:
+        # Label each period with its first trading day so labels are real dates
+        series = f"""
+            SELECT MIN(date) AS time, {', '.join(f'{SERIES_FIELDS[f][1]} AS {f}' for f in fields)}
+            FROM ({daily}) d
+            GROUP BY DATE_TRUNC('{period}', date)
+        """
+
+    sql = f"SELECT * FROM ({series}) s"
+    if cursor:
+        sql += " WHERE s.time > %(cursor)s"
+    sql += " ORDER BY s.time ASC"
+    if limit:
+        # One extra row tells us whether there is a next page
+        sql += " LIMIT %(limit)s + 1"
+    return sql, params
+
+
+def rows_to_records(rows, fields):
+    """Tuples from build_series_query -> JSON-ready dicts (dates as strings)."""
+    casts = [int if f == "volume" else float for f in fields]
+    return [
+        {
+            "time": str(r[0]),
+            **{f: cast(v) if v is not None else None for f, cast, v in zip(fields, casts, r[1:])},
+        }
+        for r in rows
+    ]
+
+
+def lttb_indices(y, threshold):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    x is the bar position, so gaps in the calendar don't distort the triangles. The
+    first and last points are always kept; NaN values are treated as the bucket mean.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    if np.isnan(y).any():
+        y = np.where(np.isnan(y), np.nanmean(y) if not np.isnan(y).all() else 0.0, y)
+    x = np.arange(n, dtype=float)
+
+    # Bucket boundaries for the n - 2 interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+
+    prev = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the triangle's third vertex
+        nlo, nhi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+
+        area = np.abs(
+            (x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev])
+        )
+        prev = lo + int(np.argmax(area))
+        keep[i + 1] = prev
+    return keep
+
+
+# --- Multi-ticker batches ---
+MAX_BATCH_TICKERS = 50
+
+
+def parse_tickers(tickers):
+    """'aapl, msft' -> ['AAPL', 'MSFT'] (deduplicated, order kept)."""
+    names = list(dict.fromkeys(t.strip().upper() for t in (tickers or "").split(",") if t.strip()))
+    if not names:
+        raise ValueError("tickers is required, e.g. tickers=AAPL,MSFT,SPY")
+    if len(names) > MAX_BATCH_TICKERS:
+        raise ValueError(f"At most {MAX_BATCH_TICKERS} tickers per request")
+    return names
+
+
+def build_batch_query(fields, start=None, end=None):
+    """One query for every ticker in %(tickers)s: rows of (ticker, date, *fields)."""
+    filters = ["c.ticker = ANY(%(tickers)s)"]
+    if start:
+        filters.append("c.date >= %(start)s")
+    if end:
+        filters.append("c.date <= %(end)s")
+    sql = f"""
+        SELECT c.ticker, c.date, {', '.join(SERIES_FIELDS[f][0] for f in fields)}
+        FROM analytics.chart_series c
+        WHERE {' AND '.join(filters)}
+        ORDER BY c.date ASC
+    """
+    return sql, {"start": start, "end": end}
+
+
+def align_batch(rows, tickers, fields):
+    """
+    Pivot (ticker, date, *fields) rows onto the union of their dates.
+
+    Returns (days, {ticker: {field: float64 array}}) with NaN where a ticker has no bar.
+    """
+    if not rows:
+        return np.empty(0, dtype=np.int32), {t: {f: np.empty(0) for f in fields} for t in tickers}
+
+    transposed = list(zip(*rows))
+    ordinals = np.fromiter((d.toordinal() for d in transposed[1]), np.int64, len(rows))
+    axis, date_idx = np.unique(ordinals, return_inverse=True)
+    position = {t: i for i, t in enumerate(tickers)}
+    ticker_idx = np.fromiter((position[t] for t in transposed[0]), np.int64, len(rows))
+
+    series = {t: {} for t in tickers}
+    for f, col in zip(fields, transposed[2:]):
+        values = np.fromiter((np.nan if v is None else float(v) for v in col), np.float64, len(rows))
+        grid = np.full((len(tickers), len(axis)), np.nan)
+        grid[ticker_idx, date_idx] = values
+        for t, i in position.items():
+            series[t][f] = grid[i]
+
+    epoch = date(1970, 1, 1).toordinal()
+    return (axis - epoch).astype(np.int32), series
+
+
+def relative_performance(close, benchmark_close):
+    """
+    Cumulative return relative to the benchmark, rebased at the first shared date.
+
+    (close_t / close_0) / (bench_t / bench_0) - 1, NaN where either side has no bar.
+    """
+    both = ~np.isnan(close) & ~np.isnan(benchmark_close)
+    out = np.full(close.shape, np.nan)
+    if not both.any():
+        return out
+    base = np.argmax(both)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[both] = (close[both] / close[base]) / (benchmark_close[both] / benchmark_close[base]) - 1
+    return out
@@ -0,0 +1,81 @@
+"""
+Backtest parameter sweeps over a synthetic factor panel: one process vs BacktestPool.
+
+Builds tickers x days of random-walk prices, computes their factors with the
+pipeline's indicator engine, writes them as a factor panel in a temporary directory
+and times, per strategy, one backtest and a full sweep run serially and across the
+pool's processes (each memory-maps the panel itself).
+
+    python benchmarks/bench_backtest.py --tickers 1000 --days 1260 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+
+from synthetic import AIRFLOW_SCRIPTS, BACKEND, add_import_path, price_frame
+
+add_import_path(AIRFLOW_SCRIPTS)
+add_import_path(BACKEND)
+from backtest import BacktestPool, parse_params, run_backtests, strategy_fields  # noqa: E402
+from factor_panel import PANEL_FIELDS, write_panel_files  # noqa: E402
+from indicators import compute_factors  # noqa: E402
+
+SWEEPS = {
+    "rsi": ["lower=15,20,25,30,35", "upper=60,65,70,75,80"],
+    "bollinger": ["mode=reversion,breakout"],
+    "sma_cross": ["fast=5,10,20,30,50", "slow=50,100,150,200"],
+}
+
+
+def write_panel(directory, tickers, days):
+    df = compute_factors(price_frame(tickers, days)[["date", "ticker", "close"]])
+    table = pa.Table.from_pandas(df[["ticker", "date", *PANEL_FIELDS]], preserve_index=False)
+    n_dates, n_tickers = write_panel_files(table, directory)
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump({"data_version": "bench", "fields": PANEL_FIELDS, "shape": [len(PANEL_FIELDS), n_dates, n_tickers]}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=1260)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_panel(directory, args.tickers, args.days)
+        print(f"{args.tickers} tickers x {args.days} days, {args.workers} workers\n")
+        print(f"{'strategy':<10} {'combos':>6} {'single s':>9} {'serial s':>9} {'pool s':>9}")
+
+        backtests = BacktestPool(args.workers)
+        try:
+            for strategy, params in SWEEPS.items():
+                source = {"panel": directory, "tickers": None, "start": None, "end": None,
+                          "fields": strategy_fields(strategy)}
+                combos = parse_params(strategy, params)
+
+                started = time.perf_counter()
+                run_backtests(source, strategy, combos[:1])
+                single = time.perf_counter() - started
+
+                started = time.perf_counter()
+                run_backtests(source, strategy, combos)
+                serial = time.perf_counter() - started
+
+                # First sweep also pays for spawning the processes
+                started = time.perf_counter()
+                asyncio.run(backtests.run(source, strategy, combos))
+                pooled = time.perf_counter() - started
+
+                print(f"{strategy:<10} {len(combos):>6} {single:9.3f} {serial:9.3f} {pooled:9.3f}")
+        finally:
+            backtests.close()
+
+
+if __name__ == "__main__":
+    main()
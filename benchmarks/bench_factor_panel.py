@@ -0,0 +1,78 @@
+"""
+Full-universe factor read: SQL over analytics.factors vs the memory-mapped factor panel.
+
+Reads whatever is in the database at MARKET_DB_URL (or BENCH_DB_URL), publishes a
+panel into a temporary directory and times:
+
+- pd.read_sql of every factor row (NUMERIC -> Decimal -> float per value)
+- opening the panel and scanning every field over the whole universe
+- slicing the last year of one field for every ticker (a view, no copy)
+
+    MARKET_DB_URL=postgresql://app@localhost:5432/market python benchmarks/bench_factor_panel.py
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from sqlalchemy import create_engine
+
+from synthetic import AIRFLOW_SCRIPTS, BACKEND, add_import_path
+
+add_import_path(AIRFLOW_SCRIPTS)
+add_import_path(BACKEND)
+from factor_panel import PANEL_FIELDS, publish_panel  # noqa: E402
+from panel import FactorPanel  # noqa: E402
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    db_url = os.environ.get("BENCH_DB_URL") or os.environ.get("MARKET_DB_URL")
+    if not db_url:
+        raise SystemExit("Set MARKET_DB_URL (or BENCH_DB_URL)")
+    engine = create_engine(db_url)
+
+    sql = f"SELECT date, ticker, {', '.join(PANEL_FIELDS)} FROM analytics.factors"
+    sql_s = best_of(lambda: pd.read_sql(sql, engine), args.repeat)
+
+    with tempfile.TemporaryDirectory() as root:
+        conn = psycopg2.connect(db_url.replace("postgresql+psycopg2://", "postgresql://"))
+        started = time.perf_counter()
+        publish_panel(conn, "bench", root=root)
+        publish_s = time.perf_counter() - started
+        conn.close()
+
+        def full_read():
+            panel = FactorPanel.open(root)
+            for field in PANEL_FIELDS:
+                np.nanmean(panel.field(field))
+
+        panel = FactorPanel.open(root)
+        year_ago = date.today() - timedelta(days=365)
+        open_s = best_of(full_read, args.repeat)
+        slice_s = best_of(lambda: panel.slice("log_return", start=year_ago), args.repeat)
+
+    print(f"panel {panel.values.shape} ({panel.values.nbytes / 2**20:.1f} MB)\n")
+    print(f"{'pd.read_sql all factors':<44} {sql_s * 1000:10.1f} ms")
+    print(f"{'publish panel (pipeline cost, once per run)':<44} {publish_s * 1000:10.1f} ms")
+    print(f"{'open panel + scan every field':<44} {open_s * 1000:10.1f} ms")
+    print(f"{'last year of log_return, all tickers':<44} {slice_s * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
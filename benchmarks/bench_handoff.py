@@ -0,0 +1,104 @@
+"""
+Wall time and peak memory of the extract -> transform -> load file handoff, CSV vs Arrow IPC.
+
+Each (format, stage) runs in a fresh interpreter so peak RSS isn't polluted by the
+previous stage. Only the file I/O that the format affects is measured; the database
+merge in load is format-independent and left out.
+
+    python benchmarks/bench_handoff.py --tickers 500 --days 1260
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from synthetic import AIRFLOW_SCRIPTS, add_import_path, price_frame
+
+add_import_path(AIRFLOW_SCRIPTS)
+import handoff  # noqa: E402
+
+EXTRACT_CHUNK_SIZE = 50
+LOAD_CHUNK_ROWS = 50_000
+TRANSFORM_CHUNK_ROWS = 100_000
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def stage_extract(directory, fmt, tickers, days):
+    df = price_frame(tickers, days)
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    # One write per download chunk, like extract.py
+    rows_per_chunk = EXTRACT_CHUNK_SIZE * days
+    with handoff.PriceWriter(handoff.handoff_path(directory, "raw_market_data", fmt)) as writer:
+        for offset in range(0, len(df), rows_per_chunk):
+            writer.write(df.iloc[offset:offset + rows_per_chunk])
+    return time.perf_counter() - started, peak_rss_mb() - baseline
+
+
+def stage_transform(directory, fmt, tickers, days):
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    df = handoff.read_prices(handoff.handoff_path(directory, "raw_market_data", fmt))
+    df = df.dropna(subset=['close', 'open'])
+    df = df[df['close'] > 0]
+    handoff.write_prices(df, handoff.handoff_path(directory, "clean_market_data", fmt))
+    return time.perf_counter() - started, peak_rss_mb() - baseline
+
+
+def stage_transform_streaming(directory, fmt, tickers, days):
+    # What transform.py does: one TRANSFORM_CHUNK_ROWS batch in memory at a time
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    raw_path = handoff.handoff_path(directory, "raw_market_data", fmt)
+    with handoff.PriceWriter(handoff.handoff_path(directory, "clean_market_data", fmt)) as writer:
+        for df in handoff.iter_prices(raw_path, TRANSFORM_CHUNK_ROWS):
+            df = df.assign(adj_close=df['adj_close'].fillna(df['close']))
+            df = df.dropna(subset=['close', 'open'])
+            writer.write(df[df['close'] > 0])
+    return time.perf_counter() - started, peak_rss_mb() - baseline
+
+
+def stage_load(directory, fmt, tickers, days):
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    rows = 0
+    for chunk in handoff.iter_prices(handoff.handoff_path(directory, "clean_market_data", fmt), LOAD_CHUNK_ROWS):
+        rows += len(chunk)
+    return time.perf_counter() - started, peak_rss_mb() - baseline
+
+
+STAGES = [("extract (write raw)", stage_extract),
+          ("transform (whole file)", stage_transform),
+          ("transform (streaming)", stage_transform_streaming),
+          ("load (chunked read clean)", stage_load)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=1260)
+    args = parser.parse_args()
+
+    print(f"{args.tickers} tickers x {args.days} days = {args.tickers * args.days:,} rows\n")
+    print(f"{'stage':<34} {'format':<6} {'wall s':>8} {'peak MB':>9} {'file MB':>9}")
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in ("csv", "arrow"):
+            for name, stage in STAGES:
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    seconds, peak = pool.submit(stage, directory, fmt, args.tickers, args.days).result()
+                output = "raw_market_data" if stage is stage_extract else "clean_market_data"
+                size = os.path.getsize(handoff.handoff_path(directory, output, fmt)) / 2**20
+                print(f"{name:<34} {fmt:<6} {seconds:8.2f} {peak:9.1f} {size:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Load and query times for raw.price_ohlcv before and after yearly partitioning.
+
+Builds both layouts side by side in scratch schemas of a real Postgres database:
+
+- heap         the original table: SERIAL id, UNIQUE (ticker, date) and a duplicate
+               (ticker, date) B-tree
+- partitioned  migration 004: PRIMARY KEY (ticker, date), yearly range partitions
+               and a BRIN index on date
+
+Each layout gets the same synthetic history through the load task's COPY + merge,
+then a run of daily incremental loads, then the queries the pipeline and API issue.
+The database needs system.ensure_year_partitions (init.sql / migration 004). The
+scratch schemas are dropped afterwards.
+
+    BENCH_DB_URL=postgresql://app@localhost:5432/market python benchmarks/bench_partitioning.py --tickers 500 --days 2520
+"""
+import argparse
+import os
+import time
+
+import psycopg2
+
+from synthetic import AIRFLOW_SCRIPTS, add_import_path, price_frame
+
+add_import_path(AIRFLOW_SCRIPTS)
+from handoff import PRICE_COLUMNS  # noqa: E402
+from load import CREATE_STAGE_SQL, copy_frame  # noqa: E402
+
+COLUMNS = """
+    ticker VARCHAR(10) NOT NULL,
+    date DATE NOT NULL,
+    open NUMERIC(12, 4),
+    high NUMERIC(12, 4),
+    low NUMERIC(12, 4),
+    close NUMERIC(12, 4),
+    adj_close NUMERIC(12, 4),
+    volume BIGINT,
+    load_ts TIMESTAMP DEFAULT NOW()
+"""
+
+LAYOUTS = {
+    "heap": f"""
+        CREATE TABLE {{schema}}.price_ohlcv (id SERIAL PRIMARY KEY, {COLUMNS}, UNIQUE (ticker, date));
+        CREATE INDEX ON {{schema}}.price_ohlcv (ticker, date);
+    """,
+    "partitioned": f"""
+        CREATE TABLE {{schema}}.price_ohlcv ({COLUMNS}, PRIMARY KEY (ticker, date)) PARTITION BY RANGE (date);
+        SELECT system.ensure_year_partitions('{{schema}}.price_ohlcv', %(first)s, %(last)s);
+        CREATE INDEX ON {{schema}}.price_ohlcv USING BRIN (date);
+    """,
+}
+
+MERGE_SQL = """
+    INSERT INTO {schema}.price_ohlcv (ticker, date, open, high, low, close, adj_close, volume)
+    SELECT ticker, date, open, high, low, close, adj_close, volume::BIGINT
+    FROM stage_price_ohlcv
+    ORDER BY date, ticker
+    ON CONFLICT (ticker, date) DO UPDATE SET close = EXCLUDED.close, load_ts = now()
+"""
+
+QUERIES = [
+    ("one ticker, last year", "SELECT date, close FROM {schema}.price_ohlcv WHERE ticker = %(ticker)s AND date >= %(year_ago)s"),
+    ("all tickers, last 30 days", "SELECT ticker, date, close FROM {schema}.price_ohlcv WHERE date >= %(month_ago)s"),
+    ("full history (factor rebuild)", "SELECT date, ticker, close FROM {schema}.price_ohlcv ORDER BY ticker, date"),
+    ("max date per ticker", "SELECT ticker, MAX(date) FROM {schema}.price_ohlcv GROUP BY ticker"),
+]
+
+
+def load(conn, schema, df):
+    """The load task's path: COPY into a temp stage, then one merge. Returns seconds."""
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(CREATE_STAGE_SQL)
+        copy_frame(cur, df, "stage_price_ohlcv", PRICE_COLUMNS)
+        cur.execute(MERGE_SQL.format(schema=schema))
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def timed_query(conn, sql, params, repeat):
+    best = float("inf")
+    with conn.cursor() as cur:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cur.execute(sql, params)
+            cur.fetchall()
+            best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--days", type=int, default=2520)
+    parser.add_argument("--incremental-days", type=int, default=20, help="daily loads after the bulk load")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db_url = os.environ.get("BENCH_DB_URL") or os.environ.get("MARKET_DB_URL")
+    if not db_url:
+        raise SystemExit("Set BENCH_DB_URL (or MARKET_DB_URL) to a scratch Postgres database")
+
+    df = price_frame(args.tickers, args.days + args.incremental_days)
+    dates = sorted(df["date"].unique())
+    history = df[df["date"] <= dates[args.days - 1]]
+    daily = [df[df["date"] == d] for d in dates[args.days:]]
+    params = {
+        "ticker": "T0000",
+        "year_ago": dates[-252],
+        "month_ago": dates[-21],
+        "first": dates[0],
+        "last": dates[-1],
+    }
+    print(f"{args.tickers} tickers x {args.days} days = {len(history):,} rows, then {len(daily)} daily loads\n")
+
+    conn = psycopg2.connect(db_url.replace("postgresql+psycopg2://", "postgresql://"))
+    results = {}
+    try:
+        for layout, ddl in LAYOUTS.items():
+            schema = f"bench_{layout}"
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+                cur.execute(ddl.format(schema=schema), params)
+            conn.commit()
+
+            row = {"bulk load s": load(conn, schema, history)}
+            row["daily load ms"] = 1000 * sum(load(conn, schema, d) for d in daily) / max(len(daily), 1)
+            with conn.cursor() as cur:
+                cur.execute(f"ANALYZE {schema}.price_ohlcv")
+                # pg_partition_tree is empty for a plain table
+                cur.execute(
+                    "SELECT COALESCE((SELECT SUM(pg_total_relation_size(relid)) FROM pg_partition_tree(%(t)s)),"
+                    " pg_total_relation_size(%(t)s))",
+                    {"t": f"{schema}.price_ohlcv"},
+                )
+                row["size MB"] = cur.fetchone()[0] / 2**20
+            conn.commit()
+            for name, sql in QUERIES:
+                row[f"{name} ms"] = 1000 * timed_query(conn, sql.format(schema=schema), params, args.repeat)
+            results[layout] = row
+    finally:
+        with conn.cursor() as cur:
+            for layout in LAYOUTS:
+                cur.execute(f"DROP SCHEMA IF EXISTS bench_{layout} CASCADE")
+        conn.commit()
+        conn.close()
+
+    print(f"{'':<36}" + "".join(f"{layout:>14}" for layout in results))
+    for metric in next(iter(results.values())):
+        print(f"{metric:<36}" + "".join(f"{row[metric]:14.2f}" for row in results.values()))
+
+
+if __name__ == "__main__":
+    main()
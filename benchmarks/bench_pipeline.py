@@ -0,0 +1,194 @@
+"""
+Every pipeline stage, end to end, against synthetic prices in a scratch Postgres.
+
+Generates tickers x years of random-walk bars ending yesterday, serves them through
+the fixture data source and runs extract -> transform -> load -> factors -> validate
+exactly as the DAG would, each stage in a fresh interpreter so peak RSS is its own.
+The stages record themselves through airflow/scripts/metrics.py, so results land in
+system.pipeline_metrics of the bench database under one run id and can be compared
+across commits with plain SQL (or appended to a JSON lines file with --output).
+With --shards N the run is laid out like the sharded DAG instead: plan_shards, then
+each shard's extract -> transform -> load -> factors in N parallel processes, then
+validate and finalize_run.
+
+BENCH_DB_URL must point at a database you don't mind losing: price, factor and
+state tables are emptied before the run. --init applies postgres/init.sql first.
+A new ticker is extracted with BACKFILL_DAYS (about 5 years) of history, so years
+beyond that are generated but never loaded.
+
+    BENCH_DB_URL=postgresql://app@localhost:5432/bench \\
+        python benchmarks/bench_pipeline.py --tickers 500 --years 5 --init --output results.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+import psycopg2
+
+from synthetic import AIRFLOW_SCRIPTS, ROOT, add_import_path, price_frame
+
+STAGES = [
+    ("extract_market_data", "extract", "extract_market_data"),
+    ("transform_market_data", "transform", "transform_market_data"),
+    ("load_to_postgres", "load", "load_to_postgres"),
+    ("calculate_factors", "factor_analysis", "calculate_factors"),
+    ("validate_and_repair_data", "validate", "auto_repair_data"),
+]
+
+RESET_SQL = """
+    TRUNCATE raw.price_ohlcv, analytics.factors, analytics.ticker_registry, system.ticker_watermarks,
+        system.factor_queue;
+    DELETE FROM system.state;
+    REFRESH MATERIALIZED VIEW analytics.chart_series;
+    REFRESH MATERIALIZED VIEW analytics.factor_snapshot;
+"""
+
+# One shard's tasks as the DAG's mapped task group runs them: (module, function,
+# keyword arguments from the shard plan and the previous task's return value)
+SHARD_STAGES = [
+    ("extract", "extract_market_data", lambda plan, prev: {"tickers": plan["tickers"]}),
+    ("transform", "transform_market_data", lambda plan, prev: {"raw_path": prev}),
+    ("load", "load_to_postgres", lambda plan, prev: {"clean_path": prev, "publish": False}),
+    ("factor_analysis", "calculate_factors", lambda plan, prev: {"tickers": plan["tickers"], "publish": False}),
+]
+
+RUN_METRICS_SQL = """
+    SELECT stage, shard, step, status, seconds, rows, calls, peak_rss_mb
+    FROM system.pipeline_metrics
+    WHERE run_id = %s
+    ORDER BY id
+"""
+
+
+class TaskInstance:
+    """The two XCom calls the pipeline scripts make, backed by a dict."""
+
+    def __init__(self, xcoms):
+        self.xcoms = xcoms
+
+    def xcom_pull(self, task_ids, key=None):
+        return self.xcoms.get(task_ids if key is None else key)
+
+    def xcom_push(self, key, value):
+        self.xcoms[key] = value
+
+
+def run_stage(module, function, xcoms, run_id, **kwargs):
+    add_import_path(AIRFLOW_SCRIPTS)
+    task = getattr(__import__(module), function)
+    return task(ti=TaskInstance(xcoms), run_id=run_id, **kwargs)
+
+
+def run_shard(plan, run_id):
+    prev = None
+    for module, function, kwargs in SHARD_STAGES:
+        # Nothing extracted: the DAG skips transform and load, factors still run
+        if module in ("transform", "load") and not prev:
+            continue
+        prev = run_stage(module, function, {}, run_id, shard=plan["shard"], **kwargs(plan, prev))
+    return plan["shard"]
+
+
+def run_sharded(ctx, n_shards, run_id):
+    os.environ["PIPELINE_SHARDS"] = str(n_shards)
+    with ctx.Pool(1) as pool:
+        plans = pool.apply(run_stage, ("sharding", "plan_shards", {}, run_id))
+    with ctx.Pool(len(plans)) as pool:
+        pool.starmap(run_shard, [(plan, run_id) for plan in plans])
+    for module, function in [("validate", "auto_repair_data"), ("sharding", "finalize_run")]:
+        with ctx.Pool(1) as pool:
+            pool.apply(run_stage, (module, function, {}, run_id))
+
+
+def write_fixture(directory, tickers, years):
+    n_days = years * 252
+    end = pd.Timestamp(date.today() - timedelta(days=1))
+    start = pd.bdate_range(end=end, periods=n_days)[0]
+    df = price_frame(tickers, n_days, start=start.strftime("%Y-%m-%d"))
+    # validate.py aligns every ticker to SPY's calendar
+    df["ticker"] = df["ticker"].replace({"T0000": "SPY"})
+
+    prices = os.path.join(directory, "prices.csv")
+    df.to_csv(prices, index=False)
+    universe = os.path.join(directory, "universe.txt")
+    with open(universe, "w") as f:
+        f.write("\n".join(df["ticker"].unique()))
+    return prices, universe, len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--init", action="store_true", help="apply postgres/init.sql first")
+    parser.add_argument("--shards", type=int, help="run like the sharded DAG with this many parallel shards")
+    parser.add_argument("--output", help="append one JSON line per step to this file")
+    args = parser.parse_args()
+
+    db_url = os.environ.get("BENCH_DB_URL")
+    if not db_url:
+        raise SystemExit("Set BENCH_DB_URL to a scratch database (its tables are emptied)")
+
+    conn = psycopg2.connect(db_url.replace("postgresql+psycopg2://", "postgresql://"))
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        if args.init:
+            with open(os.path.join(ROOT, "postgres", "init.sql")) as f:
+                cur.execute(f.read())
+        cur.execute(RESET_SQL)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        prices, universe, n_rows = write_fixture(workdir, args.tickers, args.years)
+        # Read by the stage processes at import time
+        os.environ.update({
+            "MARKET_DB_URL": db_url,
+            "MARKET_DATA_SOURCE": f"fixture:{prices}",
+            "TICKER_UNIVERSE_FILE": universe,
+            "PIPELINE_DATA_DIR": os.path.join(workdir, "runs"),
+            "FACTOR_PANEL_DIR": os.path.join(workdir, "panel"),
+        })
+
+        run_id = f"bench__{args.tickers}x{args.years}y__{time.strftime('%Y-%m-%dT%H:%M:%S')}"
+        print(f"{args.tickers} tickers x {args.years} years = {n_rows:,} bars, run id {run_id}\n")
+
+        ctx = multiprocessing.get_context("spawn")
+        started = time.perf_counter()
+        if args.shards:
+            run_sharded(ctx, args.shards, run_id)
+        else:
+            xcoms = {}
+            for task_id, module, function in STAGES:
+                with ctx.Pool(1) as pool:
+                    xcoms[task_id] = pool.apply(run_stage, (module, function, xcoms, run_id))
+        elapsed = time.perf_counter() - started
+
+    with conn.cursor() as cur:
+        cur.execute(RUN_METRICS_SQL, (run_id,))
+        rows = cur.fetchall()
+    conn.close()
+
+    print(f"{'stage':<10} {'shard':>5} {'step':<14} {'seconds':>9} {'rows':>11} {'rows/s':>12} {'peak MB':>8}")
+    for stage, shard, step, status, seconds, n, calls, peak in rows:
+        rate = f"{n / seconds:12,.0f}" if n and seconds else f"{'':>12}"
+        print(f"{stage:<10} {shard if shard is not None else '':>5} {step:<14} {seconds:9.3f} "
+              f"{n if n is not None else '':>11} {rate} {peak:8.0f}"
+              + ("" if status == "success" else f"  ({status})"))
+    print(f"\nwall time {elapsed:.2f}s")
+
+    if args.output:
+        with open(args.output, "a") as f:
+            for stage, shard, step, status, seconds, n, calls, peak in rows:
+                f.write(json.dumps({
+                    "run_id": run_id, "tickers": args.tickers, "years": args.years, "shards": args.shards,
+                    "stage": stage, "shard": shard, "step": step, "status": status,
+                    "seconds": seconds, "rows": n, "calls": calls, "peak_rss_mb": peak,
+                }) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Serialize time and payload size of the price series wire formats.
+
+Rows mimic what psycopg2 returns for the prices query (date, NUMERIC as Decimal,
+BIGINT volume, NULL indicators during the warm-up), so the numbers include the
+same conversions the API does.
+
+    python benchmarks/bench_wire_formats.py --rows 5000
+"""
+import argparse
+import gzip
+import json
+import time
+from decimal import Decimal
+
+from synthetic import BACKEND, add_import_path, price_frame
+
+add_import_path(BACKEND)
+from series import SERIES_FIELDS, rows_to_records  # noqa: E402
+from wire import encode_binary, encode_columns_json, to_columns  # noqa: E402
+
+
+def db_rows(n):
+    df = price_frame(1, n)
+    rows = []
+    for i, r in enumerate(df.itertuples(index=False)):
+        warm = i < 20
+        q = lambda v, places="0.0001": Decimal(str(v)).quantize(Decimal(places))  # noqa: E731
+        rows.append((
+            r.date, q(r.open), q(r.high), q(r.low), q(r.close), int(r.volume),
+            None if warm else q(r.close), None if warm else q(r.close * 1.05), None if warm else q(r.close * 0.95),
+            None if warm else q(50.0), None if i == 0 else q(0.001, "0.000001"), None if warm else q(0.2, "0.000001"),
+        ))
+    return rows
+
+
+def encode_json_rows(rows, fields):
+    return json.dumps(rows_to_records(rows, fields), separators=(",", ":")).encode()
+
+
+def encode_columns(rows, fields):
+    return encode_columns_json(*to_columns(rows, fields))
+
+
+def encode_packed(rows, fields):
+    return encode_binary(*to_columns(rows, fields))
+
+
+FORMATS = [("json rows", encode_json_rows), ("columns json", encode_columns), ("binary", encode_packed)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fields = list(SERIES_FIELDS)
+    rows = db_rows(args.rows)
+    print(f"{args.rows} bars x {len(fields)} fields\n")
+    print(f"{'format':<14} {'encode ms':>10} {'bytes':>12} {'gzip bytes':>12}")
+
+    for name, encode in FORMATS:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            body = encode(rows, fields)
+            timings.append(time.perf_counter() - started)
+        print(f"{name:<14} {min(timings) * 1000:10.2f} {len(body):12,} {len(gzip.compress(body)):12,}")
+
+
+if __name__ == "__main__":
+    main()
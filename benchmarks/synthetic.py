@@ -0,0 +1,40 @@
+"""Synthetic price data shared by the benchmark scripts."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AIRFLOW_SCRIPTS = os.path.join(ROOT, "airflow", "scripts")
+BACKEND = os.path.join(ROOT, "backend")
+
+def add_import_path(path):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+def ticker_names(n):
+    return [f"T{i:04d}" for i in range(n)]
+
+def price_frame(n_tickers=100, n_days=1260, seed=0, start="2019-01-02"):
+    """Long (ticker, date, open, high, low, close, adj_close, volume) frame of random walks."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_days)
+    tickers = ticker_names(n_tickers)
+
+    log_steps = rng.normal(0.0003, 0.015, size=(n_days, n_tickers))
+    close = 50 * np.exp(np.cumsum(log_steps, axis=0)) * rng.uniform(0.5, 5, n_tickers)
+    spread = np.abs(rng.normal(0, 0.01, size=close.shape))
+
+    df = pd.DataFrame({
+        "ticker": np.repeat(tickers, n_days),
+        "date": np.tile(dates.date, n_tickers),
+        "open": (close * (1 + rng.normal(0, 0.005, close.shape))).T.ravel(),
+        "high": (close * (1 + spread)).T.ravel(),
+        "low": (close * (1 - spread)).T.ravel(),
+        "close": close.T.ravel(),
+        "volume": rng.integers(100_000, 50_000_000, close.size),
+    })
+    df["adj_close"] = df["close"]
+    df[["open", "high", "low", "close", "adj_close"]] = df[["open", "high", "low", "close", "adj_close"]].round(4)
+    return df[["ticker", "date", "open", "high", "low", "close", "adj_close", "volume"]]
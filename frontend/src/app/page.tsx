@@ -1,7 +1,32 @@
 "use client";
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { StockChart } from '../components/StockChart';
 import { TickerSidebar } from '../components/TickerSidebar';
+import { fetchSeries, SeriesRow } from '../lib/series';
+import { INTRADAY_MAX_BARS, mergeBar, subscribeIntraday } from '../lib/intraday';
+
+// First date shown for a timeframe (same rules as StockChart); null = full history
+const timeframeStart = (timeframe: string): string | null => {
+  const now = new Date();
+  const start = new Date(now.getFullYear(), now.getMonth(), now.getDate());
+  switch (timeframe) {
+    case '1M':
+      start.setMonth(start.getMonth() - 1);
+      break;
+    case '3M':
+      start.setMonth(start.getMonth() - 3);
+      break;
+    case '1Y':
+      start.setFullYear(start.getFullYear() - 1);
+      break;
+    case 'YTD':
+      start.setMonth(0, 1);
+      break;
+    default:
+      return null;
+  }
+  return start.toISOString().split('T')[0];
+};
 
 export default function Home() {
   const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
@@ -19,6 +44,11 @@ export default function Home() {
   const [showSMA, setShowSMA] = useState<boolean>(true);
   const [showBollinger, setShowBollinger] = useState<boolean>(true);
   const [showSPY, setShowSPY] = useState<boolean>(false);
+
+  // Intraday bars pushed by the server (empty when no live feed is configured). The
+  // list is updated in place on every tick; only the latest bar is state to re-render on
+  const intradayBars = useRef<SeriesRow[]>([]);
+  const [liveBar, setLiveBar] = useState<SeriesRow | null>(null);
   
   // Close menu when ticker is selected (mobile UX)
   const handleTickerSelect = (ticker: string) => {
@@ -26,41 +56,51 @@ export default function Home() {
     setMenuOpen(false);
   };
 
+  // Only request the range the selected timeframe displays
+  const start = timeframeStart(selectedTimeframe);
+  const rangeQuery = start ? `start=${start}` : '';
+
   // Fetch main ticker data
   useEffect(() => {
     setLoading(true);
     // Use the dynamic base URL instead of hardcoded localhost
-    fetch(`${API_BASE_URL}/api/prices/${selectedTicker}`)
-      .then(res => res.json())
-      .then(json => {
-        if (json.error) {
-          console.error('API Error:', json.error);
-          return;
-        }
-        setData(json);
+    fetchSeries(`${API_BASE_URL}/api/prices/${selectedTicker}?${rangeQuery}`)
+      .then(rows => {
+        setData(rows);
         setLoading(false);
       })
       .catch(err => {
         console.error('Fetch Error:', err);
         setLoading(false);
       });
-  }, [selectedTicker, API_BASE_URL]);
+  }, [selectedTicker, rangeQuery, API_BASE_URL]);
 
   // Fetch SPY data when comparison is enabled
   useEffect(() => {
-    if (showSPY && spyData.length === 0) {
-      fetch(`${API_BASE_URL}/api/prices/SPY`)
-        .then(res => res.json())
-        .then(json => {
-          if (json.error) {
-            console.error('SPY API Error:', json.error);
-            return;
-          }
-          setSpyData(json);
-        })
+    if (showSPY) {
+      // The comparison line only needs closes
+      fetchSeries(`${API_BASE_URL}/api/prices/SPY?fields=close&${rangeQuery}`)
+        .then(rows => setSpyData(rows))
         .catch(err => console.error('SPY Fetch Error:', err));
     }
-  }, [showSPY, spyData.length, API_BASE_URL]);
+  }, [showSPY, rangeQuery, API_BASE_URL]);
+
+  // Live intraday bars for the selected ticker: one snapshot, then deltas only
+  useEffect(() => {
+    const reset = (bars: SeriesRow[]) => {
+      intradayBars.current = bars.slice(-INTRADAY_MAX_BARS);
+      setLiveBar(bars.length > 0 ? bars[bars.length - 1] : null);
+    };
+    reset([]);
+    return subscribeIntraday(API_BASE_URL, [selectedTicker], {
+      onSnapshot: (_, bars) => reset(bars),
+      onBar: (_, bar) => {
+        mergeBar(intradayBars.current, bar);
+        setLiveBar(bar);
+      },
+      onDisabled: () => reset([]),
+    });
+  }, [selectedTicker, API_BASE_URL]);
 
   // Extract latest technical specs
   const latestData = data.length > 0 ? data[data.length - 1] : null;
@@ -81,6 +121,9 @@ export default function Home() {
     ? (logReturn >= 0 ? 'text-signal-green' : 'text-signal-red')
     : '';
 
+  const liveClose = typeof liveBar?.close === 'number' ? liveBar.close.toFixed(2) : null;
+  const liveTime = liveBar ? String(liveBar.time).slice(11, 16) : '';
+
   const timeframes = ['1M', '3M', '1Y', 'YTD', 'ALL'];
 
   return (
@@ -119,7 +162,7 @@ export default function Home() {
               gridColumn: '1 / -1', 
               padding: 'var(--space-lg) var(--space-xl)',
               display: 'grid',
-              gridTemplateColumns: '1fr 1fr',
+              gridTemplateColumns: liveClose ? '1fr 1fr 1fr' : '1fr 1fr',
               gap: 'var(--space-xl)'
             }}
           >
@@ -148,6 +191,21 @@ export default function Home() {
                 <p>Daily Log Return: Used for statistical modeling because log returns are additive across time periods.</p>
               </div>
             </div>
+
+            {/* Live intraday price, only while a feed is streaming */}
+            {liveClose && (
+              <div className="animate-fade-in metric-wrapper" style={{ animationDelay: '100ms' }}>
+                <p className="label-micro" style={{ marginBottom: 'var(--space-sm)' }}>
+                  LIVE {liveTime}
+                </p>
+                <p className="metric-display">
+                  {liveClose}
+                </p>
+                <div className="metric-tooltip">
+                  <p>Latest intraday bar, pushed by the server as it forms. Indicators on intraday bars use the same formulas as the daily chart.</p>
+                </div>
+              </div>
+            )}
           </header>
 
           {/* Ticker Watermark + Timeframe Controls */}
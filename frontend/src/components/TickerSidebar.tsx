@@ -6,9 +6,14 @@ interface TickerSidebarProps {
   onTickerSelect: (ticker: string) => void;
 }
 
+interface TickerSummary {
+  ticker: string;
+  day_change: number | null;
+}
+
 export const TickerSidebar = ({ selectedTicker, onTickerSelect }: TickerSidebarProps) => {
   const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
-  const [tickers, setTickers] = useState<string[]>([]);
+  const [tickers, setTickers] = useState<TickerSummary[]>([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -19,7 +24,7 @@ export const TickerSidebar = ({ selectedTicker, onTickerSelect }: TickerSidebarP
           console.error('API Error:', json.error);
           return;
         }
-        setTickers(json.tickers || []);
+        setTickers(json.data || []);
         setLoading(false);
       })
       .catch(err => {
@@ -37,13 +42,19 @@ export const TickerSidebar = ({ selectedTicker, onTickerSelect }: TickerSidebarP
           </div>
         ) : (
           <div className="stagger-children">
-            {tickers.map((ticker) => (
+            {tickers.map(({ ticker, day_change }) => (
               <button
                 key={ticker}
                 onClick={() => onTickerSelect(ticker)}
                 className={`ticker-btn animate-fade-in ${selectedTicker === ticker ? 'selected' : ''}`}
+                style={{ display: 'flex', justifyContent: 'space-between' }}
               >
-                {ticker}
+                <span>{ticker}</span>
+                {day_change != null && (
+                  <span className={day_change >= 0 ? 'text-signal-green' : 'text-signal-red'}>
+                    {day_change >= 0 ? '+' : ''}{(day_change * 100).toFixed(2)}%
+                  </span>
+                )}
               </button>
             ))}
           </div>
@@ -0,0 +1,47 @@
+// Live intraday bars over Server-Sent Events (see backend/intraday.py). The server
+// sends one snapshot per ticker on connect, then only the bars that change.
+import type { SeriesRow } from './series';
+
+export interface IntradayHandlers {
+  onSnapshot: (ticker: string, bars: SeriesRow[]) => void;
+  onBar: (ticker: string, bar: SeriesRow) => void;
+  onDisabled?: () => void;
+}
+
+// Returns an unsubscribe function; EventSource reconnects on its own after errors
+export const subscribeIntraday = (apiBase: string, tickers: string[], handlers: IntradayHandlers): (() => void) => {
+  const source = new EventSource(`${apiBase}/api/intraday/stream?tickers=${tickers.join(',')}`);
+
+  source.addEventListener('snapshot', event => {
+    const { ticker, bars } = JSON.parse((event as MessageEvent).data);
+    handlers.onSnapshot(ticker, bars);
+  });
+  source.addEventListener('bar', event => {
+    const { ticker, bar } = JSON.parse((event as MessageEvent).data);
+    handlers.onBar(ticker, bar);
+  });
+  // No feed configured on the server: stop instead of reconnecting forever
+  source.addEventListener('disabled', () => {
+    source.close();
+    handlers.onDisabled?.();
+  });
+
+  return () => source.close();
+};
+
+// Same as the server's INTRADAY_MAX_BARS default: older bars are dropped there too
+export const INTRADAY_MAX_BARS = 2000;
+
+// Apply a bar delta in place: revise the last bar if it has the same time, else
+// append it and drop the oldest bars beyond maxBars
+export const mergeBar = (bars: SeriesRow[], bar: SeriesRow, maxBars = INTRADAY_MAX_BARS): void => {
+  const last = bars.length - 1;
+  if (last >= 0 && bars[last].time === bar.time) {
+    bars[last] = bar;
+    return;
+  }
+  bars.push(bar);
+  if (bars.length > maxBars) {
+    bars.splice(0, bars.length - maxBars);
+  }
+};
@@ -0,0 +1,58 @@
+// Packed columnar price series (see backend/wire.py): far cheaper to decode than
+// one JSON object per bar with every key repeated.
+export const SERIES_BINARY = 'application/vnd.quant.columns';
+
+const DAY_MS = 86_400_000;
+
+export type SeriesRow = { time: string; [field: string]: number | string | null };
+
+interface SeriesColumn {
+  name: string;
+  dtype: 'int32' | 'float64';
+  offset: number;
+  length: number;
+}
+
+// Decode a QSER payload: magic, uint32 header length, JSON header, 8-byte aligned columns
+export const decodeSeries = (buffer: ArrayBuffer): SeriesRow[] => {
+  const magic = String.fromCharCode(...Array.from(new Uint8Array(buffer, 0, 4)));
+  if (magic !== 'QSER') {
+    throw new Error('Unexpected series payload');
+  }
+  const headerLength = new DataView(buffer).getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  const dataStart = Math.ceil((8 + headerLength) / 8) * 8;
+
+  const columns: Record<string, Int32Array | Float64Array> = {};
+  for (const col of header.columns as SeriesColumn[]) {
+    const ArrayType = col.dtype === 'int32' ? Int32Array : Float64Array;
+    columns[col.name] = new ArrayType(buffer, dataStart + col.offset, col.length);
+  }
+
+  // The chart consumes row objects; building them from typed arrays skips JSON parsing
+  const fields = Object.keys(columns).filter(name => name !== 'time');
+  const rows: SeriesRow[] = new Array(header.rows);
+  for (let i = 0; i < header.rows; i++) {
+    const row: SeriesRow = { time: new Date(columns.time[i] * DAY_MS).toISOString().slice(0, 10) };
+    for (const name of fields) {
+      const value = columns[name][i];
+      row[name] = Number.isNaN(value) ? null : value;
+    }
+    rows[i] = row;
+  }
+  return rows;
+};
+
+// Fetch a series in the binary layout; API errors still arrive as JSON
+export const fetchSeries = async (url: string): Promise<SeriesRow[]> => {
+  const res = await fetch(url, { headers: { Accept: SERIES_BINARY } });
+  const contentType = (res.headers.get('content-type') || '').split(';')[0].trim();
+  if (contentType !== SERIES_BINARY) {
+    const json = await res.json();
+    if (json.error) {
+      throw new Error(json.error);
+    }
+    return json;
+  }
+  return decodeSeries(await res.arrayBuffer());
+};
@@ -6,9 +6,8 @@ CREATE SCHEMA IF NOT EXISTS raw;
 CREATE SCHEMA IF NOT EXISTS analytics;
 CREATE SCHEMA IF NOT EXISTS system;
 
--- Raw price data table
+-- Raw price data table, range-partitioned by year (see system.ensure_year_partitions)
 CREATE TABLE IF NOT EXISTS raw.price_ohlcv (
-    id SERIAL PRIMARY KEY,
     ticker VARCHAR(10) NOT NULL,
     date DATE NOT NULL,
     open NUMERIC(12, 4),
@@ -18,12 +17,11 @@ CREATE TABLE IF NOT EXISTS raw.price_ohlcv (
     adj_close NUMERIC(12, 4),
     volume BIGINT,
     load_ts TIMESTAMP DEFAULT NOW(),
-    UNIQUE (ticker, date)
-);
+    PRIMARY KEY (ticker, date)
+) PARTITION BY RANGE (date);
 
 -- Analytics factors table (created by factor_analysis.py, but schema needed)
 CREATE TABLE IF NOT EXISTS analytics.factors (
-    id SERIAL PRIMARY KEY,
     date DATE NOT NULL,
     ticker VARCHAR(10) NOT NULL,
     close NUMERIC(12, 4),
@@ -34,9 +32,71 @@ CREATE TABLE IF NOT EXISTS analytics.factors (
     log_return NUMERIC(12, 6),
     volatility_20d NUMERIC(12, 6),
     rsi_14 NUMERIC(8, 4),
-    UNIQUE (ticker, date)
+    PRIMARY KEY (ticker, date)
+) PARTITION BY RANGE (date);
+
+-- One row per symbol: date span, bar count, latest close/day change and latest factors.
+-- Maintained by the pipeline (see scripts/state.py) so /api/tickers and the validate
+-- task never scan the bars to list symbols.
+CREATE TABLE IF NOT EXISTS analytics.ticker_registry (
+    ticker VARCHAR(10) PRIMARY KEY,
+    first_date DATE NOT NULL,
+    last_date DATE NOT NULL,
+    row_count BIGINT NOT NULL,
+    last_close DOUBLE PRECISION,
+    prev_close DOUBLE PRECISION,
+    day_change DOUBLE PRECISION,
+    factors_date DATE,
+    sma_20 DOUBLE PRECISION,
+    rsi_14 DOUBLE PRECISION,
+    volatility_20d DOUBLE PRECISION,
+    bollinger_upper DOUBLE PRECISION,
+    bollinger_lower DOUBLE PRECISION,
+    updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Prefix search (/api/tickers?q=AA) regardless of the database collation
+CREATE INDEX IF NOT EXISTS idx_ticker_registry_prefix ON analytics.ticker_registry (ticker varchar_pattern_ops);
+
+-- Create any missing yearly partitions <parent>_yYYYY covering from_date..to_date.
+-- Called by the load task before each merge, so new years (and older backfills) never
+-- hit a missing partition. Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION system.ensure_year_partitions(parent REGCLASS, from_date DATE, to_date DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    parent_schema TEXT;
+    parent_name TEXT;
+    partition_name TEXT;
+    yr INTEGER;
+    created INTEGER := 0;
+BEGIN
+    SELECT n.nspname, c.relname INTO parent_schema, parent_name
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = parent;
+
+    FOR yr IN EXTRACT(YEAR FROM from_date)::INTEGER .. EXTRACT(YEAR FROM to_date)::INTEGER LOOP
+        partition_name := format('%I.%I', parent_schema, parent_name || '_y' || yr);
+        IF to_regclass(partition_name) IS NULL THEN
+            -- Concurrent loads (one per shard) may race to create the same partition
+            BEGIN
+                EXECUTE format(
+                    'CREATE TABLE %s PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, parent, make_date(yr, 1, 1), make_date(yr + 1, 1, 1)
+                );
+                created := created + 1;
+            EXCEPTION WHEN duplicate_table OR unique_violation THEN
+                NULL;
+            END;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Enough history for the first extract's backfill, plus next year
+SELECT system.ensure_year_partitions('raw.price_ohlcv', (CURRENT_DATE - INTERVAL '6 years')::DATE, (CURRENT_DATE + INTERVAL '1 year')::DATE);
+SELECT system.ensure_year_partitions('analytics.factors', (CURRENT_DATE - INTERVAL '6 years')::DATE, (CURRENT_DATE + INTERVAL '1 year')::DATE);
+
 -- System state table (for tracking last loaded date)
 CREATE TABLE IF NOT EXISTS system.state (
     key VARCHAR(100) PRIMARY KEY,
@@ -44,9 +104,101 @@ CREATE TABLE IF NOT EXISTS system.state (
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Symbols the extract task downloads (TICKER_UNIVERSE_FILE overrides it)
+CREATE TABLE IF NOT EXISTS system.ticker_universe (
+    ticker VARCHAR(10) PRIMARY KEY,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    added_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO system.ticker_universe (ticker) VALUES ('SPY'), ('QQQ'), ('AAPL'), ('MSFT')
+ON CONFLICT (ticker) DO NOTHING;
+
+-- Last loaded bar per ticker; extraction resumes each symbol from here
+CREATE TABLE IF NOT EXISTS system.ticker_watermarks (
+    ticker VARCHAR(10) PRIMARY KEY,
+    last_date DATE NOT NULL,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Per ticker, the earliest bar whose factors need (re)computing: new bars, bars a
+-- reload revised and bars the validate task back-filled (see factor_analysis.py)
+CREATE TABLE IF NOT EXISTS system.factor_queue (
+    ticker VARCHAR(10) PRIMARY KEY,
+    first_date DATE NOT NULL,
+    queued_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Wall time, rows and peak memory per pipeline stage and step (see scripts/metrics.py)
+CREATE TABLE IF NOT EXISTS system.pipeline_metrics (
+    id BIGSERIAL PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    stage VARCHAR(50) NOT NULL,
+    step VARCHAR(50) NOT NULL,
+    status VARCHAR(10) NOT NULL,
+    started_at TIMESTAMPTZ NOT NULL,
+    seconds DOUBLE PRECISION NOT NULL,
+    rows BIGINT,
+    calls INTEGER NOT NULL DEFAULT 1,
+    peak_rss_mb DOUBLE PRECISION,
+    shard INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_metrics_step ON system.pipeline_metrics (stage, step, started_at DESC);
+
 -- Create indexes for performance
-CREATE INDEX IF NOT EXISTS idx_price_ticker_date ON raw.price_ohlcv(ticker, date);
-CREATE INDEX IF NOT EXISTS idx_factors_ticker_date ON analytics.factors(ticker, date);
+-- The (ticker, date) primary keys serve per-ticker lookups; BRIN on date is a few pages
+-- per partition and prunes date-range scans across all tickers (rows arrive in date order).
+CREATE INDEX IF NOT EXISTS idx_price_date_brin ON raw.price_ohlcv USING BRIN (date);
+CREATE INDEX IF NOT EXISTS idx_factors_date_brin ON analytics.factors USING BRIN (date);
+
+-- Serving table for the chart API: raw bars pre-joined with factors, all float8 so
+-- the backend never converts NUMERIC. Refreshed by calculate_factors; the covering
+-- unique index lets range reads be index-only scans and allows REFRESH CONCURRENTLY.
+-- The view is not CLUSTERed: concurrent refreshes don't keep heap order, and
+-- index-only scans don't read the heap anyway.
+CREATE MATERIALIZED VIEW IF NOT EXISTS analytics.chart_series AS
+SELECT
+    r.ticker,
+    r.date,
+    r.open::float8 AS open,
+    r.high::float8 AS high,
+    r.low::float8 AS low,
+    r.close::float8 AS close,
+    r.volume,
+    f.sma_20::float8 AS sma_20,
+    f.bollinger_upper::float8 AS bollinger_upper,
+    f.bollinger_lower::float8 AS bollinger_lower,
+    f.rsi_14::float8 AS rsi_14,
+    f.daily_return::float8 AS daily_return,
+    f.log_return::float8 AS log_return,
+    f.volatility_20d::float8 AS volatility_20d
+FROM raw.price_ohlcv r
+INNER JOIN analytics.factors f
+    ON r.date = f.date AND r.ticker = f.ticker
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chart_series_ticker_date ON analytics.chart_series (ticker, date)
+    INCLUDE (open, high, low, close, volume, sma_20, bollinger_upper, bollinger_lower,
+             rsi_14, daily_return, log_return, volatility_20d);
+
+-- Screens "as of" an older date read that day's bars straight from chart_series
+CREATE INDEX IF NOT EXISTS idx_chart_series_date ON analytics.chart_series (date);
+
+-- Latest-bar snapshot for the /api/screen screener: one row per ticker, its newest
+-- chart_series bar. Refreshed right after chart_series, so a screen over today's
+-- factors reads a few thousand rows instead of the whole history.
+CREATE MATERIALIZED VIEW IF NOT EXISTS analytics.factor_snapshot AS
+SELECT DISTINCT ON (ticker) *
+FROM analytics.chart_series
+ORDER BY ticker, date DESC
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_factor_snapshot_ticker ON analytics.factor_snapshot (ticker);
+CREATE INDEX IF NOT EXISTS idx_factor_snapshot_date ON analytics.factor_snapshot (date);
+CREATE INDEX IF NOT EXISTS idx_factor_snapshot_rsi ON analytics.factor_snapshot (rsi_14);
+CREATE INDEX IF NOT EXISTS idx_factor_snapshot_volatility ON analytics.factor_snapshot (volatility_20d);
+CREATE INDEX IF NOT EXISTS idx_factor_snapshot_return ON analytics.factor_snapshot (daily_return);
 
 -- Grant permissions (ensure app user can access everything)
 GRANT ALL PRIVILEGES ON SCHEMA raw TO app;
@@ -0,0 +1,43 @@
+-- UNIQUE (ticker, date) on analytics.factors, required by the incremental upsert
+-- (ON CONFLICT (ticker, date) in factor_analysis.py). Run before the other migrations.
+--
+-- Older pipeline versions rebuilt the table with pandas to_sql(if_exists='replace'),
+-- which dropped the primary key and the unique constraint, so such databases can hold
+-- repeated (ticker, date) rows and rows without a key. Those are removed, keeping the
+-- most recently written copy of each key, and the constraint is added back. Databases
+-- that already have a unique index on (ticker, date) are left untouched.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        WHERE i.indrelid = 'analytics.factors'::regclass
+          AND i.indisunique
+          AND i.indnkeyatts = 2
+          AND (
+              SELECT array_agg(a.attname::text ORDER BY a.attname::text)
+              FROM pg_attribute a
+              WHERE a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey[0:1])
+          ) = ARRAY['date', 'ticker']
+    ) THEN
+        DELETE FROM analytics.factors WHERE ticker IS NULL OR date IS NULL;
+
+        DELETE FROM analytics.factors
+        WHERE ctid IN (
+            SELECT ctid
+            FROM (
+                SELECT ctid, ROW_NUMBER() OVER (PARTITION BY ticker, date ORDER BY ctid DESC) AS copy
+                FROM analytics.factors
+            ) ranked
+            WHERE copy > 1
+        );
+
+        ALTER TABLE analytics.factors ALTER COLUMN ticker SET NOT NULL;
+        ALTER TABLE analytics.factors ALTER COLUMN date SET NOT NULL;
+        ALTER TABLE analytics.factors ADD CONSTRAINT factors_ticker_date_key UNIQUE (ticker, date);
+    END IF;
+END;
+$$;
+
+GRANT ALL PRIVILEGES ON analytics.factors TO app;
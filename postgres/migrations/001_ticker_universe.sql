@@ -0,0 +1,14 @@
+-- Ticker universe for the extract task (already part of init.sql for new databases)
+-- Apply to an existing database with:
+--   psql "$MARKET_DB_URL" -f postgres/migrations/001_ticker_universe.sql
+
+CREATE TABLE IF NOT EXISTS system.ticker_universe (
+    ticker VARCHAR(10) PRIMARY KEY,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    added_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO system.ticker_universe (ticker) VALUES ('SPY'), ('QQQ'), ('AAPL'), ('MSFT')
+ON CONFLICT (ticker) DO NOTHING;
+
+GRANT ALL PRIVILEGES ON system.ticker_universe TO app;
@@ -0,0 +1,17 @@
+-- Per-ticker high-water marks replacing the global last_loaded_date cursor
+-- Seeded from the bars already loaded, so the next run only fetches what is missing.
+
+CREATE TABLE IF NOT EXISTS system.ticker_watermarks (
+    ticker VARCHAR(10) PRIMARY KEY,
+    last_date DATE NOT NULL,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO system.ticker_watermarks (ticker, last_date)
+SELECT ticker, MAX(date)
+FROM raw.price_ohlcv
+GROUP BY ticker
+ON CONFLICT (ticker) DO UPDATE
+SET last_date = GREATEST(system.ticker_watermarks.last_date, EXCLUDED.last_date);
+
+GRANT ALL PRIVILEGES ON system.ticker_watermarks TO app;
@@ -0,0 +1,34 @@
+-- Float8 serving table for /api/prices (see init.sql)
+
+-- Serving table for the chart API: raw bars pre-joined with factors, all float8 so
+-- the backend never converts NUMERIC. Refreshed by calculate_factors; the covering
+-- unique index lets range reads be index-only scans and allows REFRESH CONCURRENTLY.
+-- The view is not CLUSTERed: concurrent refreshes don't keep heap order, and
+-- index-only scans don't read the heap anyway.
+CREATE MATERIALIZED VIEW IF NOT EXISTS analytics.chart_series AS
+SELECT
+    r.ticker,
+    r.date,
+    r.open::float8 AS open,
+    r.high::float8 AS high,
+    r.low::float8 AS low,
+    r.close::float8 AS close,
+    r.volume,
+    f.sma_20::float8 AS sma_20,
+    f.bollinger_upper::float8 AS bollinger_upper,
+    f.bollinger_lower::float8 AS bollinger_lower,
+    f.rsi_14::float8 AS rsi_14,
+    f.daily_return::float8 AS daily_return,
+    f.log_return::float8 AS log_return,
+    f.volatility_20d::float8 AS volatility_20d
+FROM raw.price_ohlcv r
+INNER JOIN analytics.factors f
+    ON r.date = f.date AND r.ticker = f.ticker
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chart_series_ticker_date ON analytics.chart_series (ticker, date)
+    INCLUDE (open, high, low, close, volume, sma_20, bollinger_upper, bollinger_lower,
+             rsi_14, daily_return, log_return, volatility_20d);
+
+GRANT ALL PRIVILEGES ON analytics.chart_series TO app;
+ALTER MATERIALIZED VIEW analytics.chart_series OWNER TO app;
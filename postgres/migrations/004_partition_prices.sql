@@ -0,0 +1,147 @@
+-- Move raw.price_ohlcv and analytics.factors to yearly range partitions (see init.sql).
+--
+-- Drops the surrogate SERIAL ids, makes (ticker, date) the primary key instead of a
+-- UNIQUE constraint plus an identical idx_*_ticker_date index, and indexes date with
+-- BRIN. Existing rows are copied in date order inside one transaction; the pipeline
+-- and API should be stopped while it runs. chart_series depends on both tables, so it
+-- is dropped and rebuilt.
+
+BEGIN;
+
+DROP MATERIALIZED VIEW IF EXISTS analytics.chart_series;
+
+ALTER TABLE raw.price_ohlcv RENAME TO price_ohlcv_heap;
+ALTER INDEX IF EXISTS raw.price_ohlcv_pkey RENAME TO price_ohlcv_heap_pkey;
+ALTER TABLE analytics.factors RENAME TO factors_heap;
+ALTER INDEX IF EXISTS analytics.factors_pkey RENAME TO factors_heap_pkey;
+
+CREATE TABLE IF NOT EXISTS raw.price_ohlcv (
+    ticker VARCHAR(10) NOT NULL,
+    date DATE NOT NULL,
+    open NUMERIC(12, 4),
+    high NUMERIC(12, 4),
+    low NUMERIC(12, 4),
+    close NUMERIC(12, 4),
+    adj_close NUMERIC(12, 4),
+    volume BIGINT,
+    load_ts TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (ticker, date)
+) PARTITION BY RANGE (date);
+
+CREATE TABLE IF NOT EXISTS analytics.factors (
+    date DATE NOT NULL,
+    ticker VARCHAR(10) NOT NULL,
+    close NUMERIC(12, 4),
+    sma_20 NUMERIC(12, 4),
+    daily_return NUMERIC(12, 6),
+    bollinger_upper NUMERIC(12, 4),
+    bollinger_lower NUMERIC(12, 4),
+    log_return NUMERIC(12, 6),
+    volatility_20d NUMERIC(12, 6),
+    rsi_14 NUMERIC(8, 4),
+    PRIMARY KEY (ticker, date)
+) PARTITION BY RANGE (date);
+
+-- Create any missing yearly partitions <parent>_yYYYY covering from_date..to_date.
+-- Called by the load task before each merge, so new years (and older backfills) never
+-- hit a missing partition. Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION system.ensure_year_partitions(parent REGCLASS, from_date DATE, to_date DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    parent_schema TEXT;
+    parent_name TEXT;
+    partition_name TEXT;
+    yr INTEGER;
+    created INTEGER := 0;
+BEGIN
+    SELECT n.nspname, c.relname INTO parent_schema, parent_name
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = parent;
+
+    FOR yr IN EXTRACT(YEAR FROM from_date)::INTEGER .. EXTRACT(YEAR FROM to_date)::INTEGER LOOP
+        partition_name := format('%I.%I', parent_schema, parent_name || '_y' || yr);
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %s PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                partition_name, parent, make_date(yr, 1, 1), make_date(yr + 1, 1, 1)
+            );
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT system.ensure_year_partitions(
+    'raw.price_ohlcv',
+    LEAST(COALESCE((SELECT MIN(date) FROM raw.price_ohlcv_heap), CURRENT_DATE), (CURRENT_DATE - INTERVAL '6 years')::DATE),
+    (CURRENT_DATE + INTERVAL '1 year')::DATE
+);
+SELECT system.ensure_year_partitions(
+    'analytics.factors',
+    LEAST(COALESCE((SELECT MIN(date) FROM analytics.factors_heap), CURRENT_DATE), (CURRENT_DATE - INTERVAL '6 years')::DATE),
+    (CURRENT_DATE + INTERVAL '1 year')::DATE
+);
+
+INSERT INTO raw.price_ohlcv (ticker, date, open, high, low, close, adj_close, volume, load_ts)
+SELECT ticker, date, open, high, low, close, adj_close, volume, load_ts
+FROM raw.price_ohlcv_heap
+ORDER BY date, ticker;
+
+INSERT INTO analytics.factors
+    (date, ticker, close, sma_20, daily_return, bollinger_upper,
+     bollinger_lower, log_return, volatility_20d, rsi_14)
+SELECT date, ticker, close, sma_20, daily_return, bollinger_upper,
+       bollinger_lower, log_return, volatility_20d, rsi_14
+FROM analytics.factors_heap
+ORDER BY date, ticker;
+
+DROP TABLE raw.price_ohlcv_heap;
+DROP TABLE analytics.factors_heap;
+
+CREATE INDEX IF NOT EXISTS idx_price_date_brin ON raw.price_ohlcv USING BRIN (date);
+CREATE INDEX IF NOT EXISTS idx_factors_date_brin ON analytics.factors USING BRIN (date);
+
+-- Serving table for the chart API: raw bars pre-joined with factors, all float8 so
+-- the backend never converts NUMERIC. Refreshed by calculate_factors; the covering
+-- unique index lets range reads be index-only scans and allows REFRESH CONCURRENTLY.
+-- The view is not CLUSTERed: concurrent refreshes don't keep heap order, and
+-- index-only scans don't read the heap anyway.
+CREATE MATERIALIZED VIEW IF NOT EXISTS analytics.chart_series AS
+SELECT
+    r.ticker,
+    r.date,
+    r.open::float8 AS open,
+    r.high::float8 AS high,
+    r.low::float8 AS low,
+    r.close::float8 AS close,
+    r.volume,
+    f.sma_20::float8 AS sma_20,
+    f.bollinger_upper::float8 AS bollinger_upper,
+    f.bollinger_lower::float8 AS bollinger_lower,
+    f.rsi_14::float8 AS rsi_14,
+    f.daily_return::float8 AS daily_return,
+    f.log_return::float8 AS log_return,
+    f.volatility_20d::float8 AS volatility_20d
+FROM raw.price_ohlcv r
+INNER JOIN analytics.factors f
+    ON r.date = f.date AND r.ticker = f.ticker
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chart_series_ticker_date ON analytics.chart_series (ticker, date)
+    INCLUDE (open, high, low, close, volume, sma_20, bollinger_upper, bollinger_lower,
+             rsi_14, daily_return, log_return, volatility_20d);
+
+-- The load task creates new yearly partitions, which needs ownership of the parents;
+-- REFRESH ... CONCURRENTLY needs ownership of the view
+GRANT ALL PRIVILEGES ON raw.price_ohlcv TO app;
+GRANT ALL PRIVILEGES ON analytics.factors TO app;
+GRANT ALL PRIVILEGES ON analytics.chart_series TO app;
+ALTER TABLE raw.price_ohlcv OWNER TO app;
+ALTER TABLE analytics.factors OWNER TO app;
+ALTER MATERIALIZED VIEW analytics.chart_series OWNER TO app;
+
+COMMIT;
+
+ANALYZE raw.price_ohlcv;
+ANALYZE analytics.factors;
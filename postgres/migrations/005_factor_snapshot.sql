@@ -0,0 +1,22 @@
+-- Latest-bar snapshot for the /api/screen screener (see init.sql)
+
+-- One row per ticker: its newest chart_series bar. Refreshed right after
+-- chart_series, so a screen over today's factors reads a few thousand rows
+-- instead of the whole history.
+CREATE MATERIALIZED VIEW IF NOT EXISTS analytics.factor_snapshot AS
+SELECT DISTINCT ON (ticker) *
+FROM analytics.chart_series
+ORDER BY ticker, date DESC
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_factor_snapshot_ticker ON analytics.factor_snapshot (ticker);
+CREATE INDEX IF NOT EXISTS idx_factor_snapshot_date ON analytics.factor_snapshot (date);
+CREATE INDEX IF NOT EXISTS idx_factor_snapshot_rsi ON analytics.factor_snapshot (rsi_14);
+CREATE INDEX IF NOT EXISTS idx_factor_snapshot_volatility ON analytics.factor_snapshot (volatility_20d);
+CREATE INDEX IF NOT EXISTS idx_factor_snapshot_return ON analytics.factor_snapshot (daily_return);
+
+-- Screens "as of" an older date read that day's bars straight from chart_series
+CREATE INDEX IF NOT EXISTS idx_chart_series_date ON analytics.chart_series (date);
+
+GRANT ALL PRIVILEGES ON analytics.factor_snapshot TO app;
+ALTER MATERIALIZED VIEW analytics.factor_snapshot OWNER TO app;
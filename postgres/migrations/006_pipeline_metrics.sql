@@ -0,0 +1,19 @@
+-- Stage/step timings recorded by the pipeline and exposed by /api/system/pipeline/metrics
+
+CREATE TABLE IF NOT EXISTS system.pipeline_metrics (
+    id BIGSERIAL PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    stage VARCHAR(50) NOT NULL,
+    step VARCHAR(50) NOT NULL,
+    status VARCHAR(10) NOT NULL,
+    started_at TIMESTAMPTZ NOT NULL,
+    seconds DOUBLE PRECISION NOT NULL,
+    rows BIGINT,
+    calls INTEGER NOT NULL DEFAULT 1,
+    peak_rss_mb DOUBLE PRECISION
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_metrics_step ON system.pipeline_metrics (stage, step, started_at DESC);
+
+GRANT ALL PRIVILEGES ON system.pipeline_metrics TO app;
+GRANT ALL PRIVILEGES ON SEQUENCE system.pipeline_metrics_id_seq TO app;
@@ -0,0 +1,59 @@
+-- Ticker registry replacing SELECT DISTINCT ticker scans (see init.sql)
+
+-- One row per symbol, maintained by the load, factor and validate tasks. Seeded here
+-- with an exact count from the bars already loaded and the current factor snapshot.
+CREATE TABLE IF NOT EXISTS analytics.ticker_registry (
+    ticker VARCHAR(10) PRIMARY KEY,
+    first_date DATE NOT NULL,
+    last_date DATE NOT NULL,
+    row_count BIGINT NOT NULL,
+    last_close DOUBLE PRECISION,
+    prev_close DOUBLE PRECISION,
+    day_change DOUBLE PRECISION,
+    factors_date DATE,
+    sma_20 DOUBLE PRECISION,
+    rsi_14 DOUBLE PRECISION,
+    volatility_20d DOUBLE PRECISION,
+    bollinger_upper DOUBLE PRECISION,
+    bollinger_lower DOUBLE PRECISION,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Prefix search (/api/tickers?q=AA) regardless of the database collation
+CREATE INDEX IF NOT EXISTS idx_ticker_registry_prefix ON analytics.ticker_registry (ticker varchar_pattern_ops);
+
+INSERT INTO analytics.ticker_registry (ticker, first_date, last_date, row_count)
+SELECT ticker, MIN(date), MAX(date), COUNT(*)
+FROM raw.price_ohlcv
+GROUP BY ticker
+ON CONFLICT (ticker) DO UPDATE
+SET first_date = EXCLUDED.first_date,
+    last_date = EXCLUDED.last_date,
+    row_count = EXCLUDED.row_count;
+
+UPDATE analytics.ticker_registry reg
+SET last_close = b.closes[1],
+    prev_close = b.closes[2],
+    day_change = b.closes[1] / NULLIF(b.closes[2], 0) - 1
+FROM analytics.ticker_registry t
+CROSS JOIN LATERAL (
+    SELECT ARRAY(
+        SELECT p.close::float8 FROM raw.price_ohlcv p
+        WHERE p.ticker = t.ticker
+        ORDER BY p.date DESC
+        LIMIT 2
+    ) AS closes
+) b
+WHERE reg.ticker = t.ticker;
+
+UPDATE analytics.ticker_registry reg
+SET factors_date = s.date,
+    sma_20 = s.sma_20,
+    rsi_14 = s.rsi_14,
+    volatility_20d = s.volatility_20d,
+    bollinger_upper = s.bollinger_upper,
+    bollinger_lower = s.bollinger_lower
+FROM analytics.factor_snapshot s
+WHERE s.ticker = reg.ticker;
+
+GRANT ALL PRIVILEGES ON analytics.ticker_registry TO app;
@@ -0,0 +1,41 @@
+-- Sharded pipeline runs (see airflow/scripts/sharding.py and init.sql)
+
+-- Which shard of the run a stage's metrics belong to; NULL for run-wide tasks
+ALTER TABLE system.pipeline_metrics ADD COLUMN IF NOT EXISTS shard INTEGER;
+
+-- Create any missing yearly partitions <parent>_yYYYY covering from_date..to_date.
+-- Called by the load task before each merge, so new years (and older backfills) never
+-- hit a missing partition. Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION system.ensure_year_partitions(parent REGCLASS, from_date DATE, to_date DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    parent_schema TEXT;
+    parent_name TEXT;
+    partition_name TEXT;
+    yr INTEGER;
+    created INTEGER := 0;
+BEGIN
+    SELECT n.nspname, c.relname INTO parent_schema, parent_name
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = parent;
+
+    FOR yr IN EXTRACT(YEAR FROM from_date)::INTEGER .. EXTRACT(YEAR FROM to_date)::INTEGER LOOP
+        partition_name := format('%I.%I', parent_schema, parent_name || '_y' || yr);
+        IF to_regclass(partition_name) IS NULL THEN
+            -- Concurrent loads (one per shard) may race to create the same partition
+            BEGIN
+                EXECUTE format(
+                    'CREATE TABLE %s PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, parent, make_date(yr, 1, 1), make_date(yr + 1, 1, 1)
+                );
+                created := created + 1;
+            EXCEPTION WHEN duplicate_table OR unique_violation THEN
+                NULL;
+            END;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT ALL PRIVILEGES ON system.pipeline_metrics TO app;
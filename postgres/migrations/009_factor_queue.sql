@@ -0,0 +1,22 @@
+-- Queue of bars whose factors need (re)computing (see init.sql and factor_analysis.py)
+
+-- One row per ticker: the earliest bar that was inserted, revised by a reload or
+-- back-filled by the validate task since its factors were last computed.
+CREATE TABLE IF NOT EXISTS system.factor_queue (
+    ticker VARCHAR(10) PRIMARY KEY,
+    first_date DATE NOT NULL,
+    queued_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Seeded once with every bar that has no factor row yet
+INSERT INTO system.factor_queue (ticker, first_date)
+SELECT r.ticker, MIN(r.date)
+FROM raw.price_ohlcv r
+LEFT JOIN analytics.factors f
+    ON f.ticker = r.ticker AND f.date = r.date
+WHERE f.ticker IS NULL
+GROUP BY r.ticker
+ON CONFLICT (ticker) DO UPDATE
+SET first_date = LEAST(system.factor_queue.first_date, EXCLUDED.first_date);
+
+GRANT ALL PRIVILEGES ON system.factor_queue TO app;
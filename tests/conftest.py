@@ -0,0 +1,74 @@
+"""
+Shared test setup.
+
+The pipeline scripts and the backend are flat modules (on the Airflow PYTHONPATH and
+in the API container), so both directories go on sys.path here. Tests that need
+Postgres take the `market_db` fixture: TEST_DB_URL must point at a scratch database,
+which gets postgres/init.sql and has its price, factor and state tables emptied before
+each test. Without TEST_DB_URL those tests are skipped; nothing touches the network.
+
+    TEST_DB_URL=postgresql://app@localhost:5432/test python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (os.path.join(ROOT, "airflow", "scripts"), os.path.join(ROOT, "backend")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+RESET_SQL = """
+    TRUNCATE raw.price_ohlcv, analytics.factors, analytics.ticker_registry, system.ticker_watermarks,
+        system.factor_queue;
+    DELETE FROM system.state;
+"""
+
+_initialized = set()
+
+
+def price_bars(tickers, n_days, start="2026-01-05", seed=0):
+    """Long (date, ticker, open, high, low, close, adj_close, volume) random-walk bars."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_days).date
+    frames = []
+    for ticker in tickers:
+        close = np.round(50 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days))), 4)
+        frames.append(pd.DataFrame({
+            "date": dates,
+            "ticker": ticker,
+            "open": close,
+            "high": np.round(close * 1.01, 4),
+            "low": np.round(close * 0.99, 4),
+            "close": close,
+            "adj_close": close,
+            "volume": rng.integers(1_000, 1_000_000, n_days),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture
+def market_db(monkeypatch):
+    """psycopg2 connection (autocommit) to an emptied TEST_DB_URL; also set as MARKET_DB_URL."""
+    psycopg2 = pytest.importorskip("psycopg2")
+    url = os.environ.get("TEST_DB_URL")
+    if not url:
+        pytest.skip("TEST_DB_URL is not set")
+
+    conn = psycopg2.connect(url.replace("postgresql+psycopg2://", "postgresql://"))
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        if url not in _initialized:
+            with open(os.path.join(ROOT, "postgres", "init.sql")) as f:
+                cur.execute(f.read())
+            _initialized.add(url)
+        cur.execute(RESET_SQL)
+    monkeypatch.setenv("MARKET_DB_URL", url)
+    try:
+        yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,113 @@
+"""Incremental extraction (airflow/scripts/extract.py) against the fixture data source."""
+from datetime import date, timedelta
+
+import pytest
+
+import extract
+from conftest import price_bars
+from data_sources import FixtureSource, MarketDataSource
+from handoff import PRICE_COLUMNS, PriceWriter, read_prices
+from metrics import StageMetrics
+
+
+class FlakySource(MarketDataSource):
+    """FixtureSource that fails the first `failures` downloads of each ticker in `flaky`."""
+
+    def __init__(self, prices, flaky, failures):
+        self.fixture = FixtureSource(prices)
+        self.flaky = set(flaky)
+        self.failures = failures
+        self.calls = {}
+
+    def download(self, tickers, start, end):
+        key = tuple(tickers)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        if self.flaky & set(tickers) and self.calls[key] <= self.failures:
+            raise ConnectionError("rate limited")
+        return self.fixture.download(tickers, start, end)
+
+
+@pytest.fixture(autouse=True)
+def no_waiting(monkeypatch):
+    monkeypatch.setattr(extract, "EXTRACT_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(extract, "EXTRACT_RATE_LIMIT", 0)
+    monkeypatch.setattr(extract, "EXTRACT_CHUNK_SIZE", 2)
+
+
+def test_plan_ranges_resumes_each_ticker_from_its_watermark():
+    end = date(2026, 3, 2)
+    watermarks = {"AAA": date(2026, 2, 20), "BBB": date(2026, 2, 20), "CCC": date(2026, 3, 1)}
+
+    plan = extract.plan_ranges(["AAA", "BBB", "CCC", "NEW"], watermarks, end)
+
+    # CCC is up to date; NEW gets the full backfill
+    assert plan == {
+        end - timedelta(days=extract.BACKFILL_DAYS): ["NEW"],
+        date(2026, 2, 21): ["AAA", "BBB"],
+    }
+
+
+def test_fetch_chunk_retries_then_succeeds():
+    bars = price_bars(["AAA"], 5)
+    source = FlakySource(bars, ["AAA"], failures=extract.EXTRACT_MAX_RETRIES - 1)
+
+    df = extract.fetch_chunk(source, ["AAA"], "2026-01-01", "2026-02-01", extract.RateLimiter(0))
+
+    assert len(df) == 5
+    assert source.calls[("AAA",)] == extract.EXTRACT_MAX_RETRIES
+
+
+def test_fetch_chunk_gives_up_after_max_retries():
+    source = FlakySource(price_bars(["AAA"], 5), ["AAA"], failures=extract.EXTRACT_MAX_RETRIES)
+
+    with pytest.raises(ConnectionError):
+        extract.fetch_chunk(source, ["AAA"], "2026-01-01", "2026-02-01", extract.RateLimiter(0))
+    assert source.calls[("AAA",)] == extract.EXTRACT_MAX_RETRIES
+
+
+def test_extract_chunks_writes_the_chunks_that_succeed(tmp_path):
+    bars = price_bars(["AAA", "BBB", "CCC", "DDD"], 10)
+    # Chunks of two: (AAA, BBB) and (CCC, DDD); the second never succeeds
+    source = FlakySource(bars, ["CCC"], failures=extract.EXTRACT_MAX_RETRIES)
+    plan = {date(2026, 1, 1): ["AAA", "BBB", "CCC", "DDD"]}
+    path = str(tmp_path / "raw.arrow")
+
+    with PriceWriter(path) as writer:
+        failed = extract.extract_chunks(source, plan, date(2026, 2, 1), writer, StageMetrics("extract", "test"))
+
+    assert sorted(failed) == ["CCC", "DDD"]
+    written = read_prices(path)
+    assert list(written.columns) == PRICE_COLUMNS
+    assert sorted(written["ticker"].unique()) == ["AAA", "BBB"]
+    assert len(written) == 20
+
+
+class TaskInstance:
+    def __init__(self):
+        self.xcoms = {}
+
+    def xcom_push(self, key, value):
+        self.xcoms[key] = value
+
+
+def test_extract_market_data_fetches_only_missing_bars(market_db, monkeypatch, tmp_path):
+    end = date.today()
+    bars = price_bars(["AAA", "BBB", "CCC"], 30, start=(end - timedelta(days=50)).isoformat())
+    bars = bars[bars["date"] < end]
+    watermark = sorted(bars["date"].unique())[-5]
+    with market_db.cursor() as cur:
+        cur.execute(
+            "INSERT INTO system.ticker_watermarks (ticker, last_date) VALUES ('AAA', %s), ('BBB', %s)",
+            (watermark, watermark),
+        )
+    monkeypatch.setattr(extract, "get_data_source", lambda: FlakySource(bars, ["CCC"], extract.EXTRACT_MAX_RETRIES))
+    monkeypatch.setattr(extract, "run_dir", lambda context, shard=None: str(tmp_path))
+    ti = TaskInstance()
+
+    path = extract.extract_market_data(tickers=["AAA", "BBB", "CCC"], shard=0, ti=ti, run_id="test_extract")
+
+    written = read_prices(path)
+    assert sorted(written["ticker"].unique()) == ["AAA", "BBB"]
+    assert (written["date"] > watermark).all()
+    assert len(written) == 2 * 4
+    assert ti.xcoms["failed_tickers"] == ["CCC"]
@@ -0,0 +1,82 @@
+"""
+Intraday bars (backend/intraday.py) replayed from tests/data/intraday_bars.csv.
+
+The recording has two tickers over an hour of 1-minute bars. Each minute gets one
+to three updates before it closes, and five stale updates for closed minutes
+arrive late.
+"""
+import asyncio
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import FACTOR_NAMES, compute_factors
+from intraday import IntradayHub, ReplayFeed
+
+RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intraday_bars.csv")
+
+
+def replay(hub):
+    asyncio.run(hub.run(ReplayFeed(RECORDING, speed=0)))
+    return hub
+
+
+@pytest.fixture(scope="module")
+def recording():
+    return pd.read_csv(RECORDING, parse_dates=["time"])
+
+
+@pytest.fixture(scope="module")
+def closed_bars(recording):
+    """What the hub should end up with: late updates dropped, the last revision of each minute kept."""
+    newest = recording.groupby("ticker")["time"].cummax()
+    current = recording[recording["time"] >= newest]
+    closed = current.groupby(["ticker", "time"], sort=True).last().reset_index()
+    return closed.assign(time=closed["time"].dt.strftime("%Y-%m-%dT%H:%M:%S"))
+
+
+def test_revisions_replace_the_forming_bar(recording, closed_bars):
+    hub = replay(IntradayHub())
+
+    for ticker, expected in closed_bars.groupby("ticker"):
+        bars = hub.snapshot(ticker)
+        assert [b["time"] for b in bars] == expected["time"].tolist()
+        assert [b["close"] for b in bars] == expected["close"].tolist()
+    assert hub.updates < len(recording)
+
+
+def test_late_updates_are_dropped(recording):
+    hub = replay(IntradayHub())
+    last = hub.snapshot("AAPL")[-1]
+    closed = hub.snapshot("AAPL")[-5]
+
+    assert hub.apply("AAPL", {**closed, "close": 1.0}) is None
+    assert hub.snapshot("AAPL")[-5]["close"] == closed["close"]
+    assert hub.snapshot("AAPL")[-1] == last
+    # The recording's own stale updates never made it in
+    assert not any(b["close"] == 1.0 for t in ("AAPL", "MSFT") for b in hub.snapshot(t))
+
+
+def test_max_bars_caps_each_ticker(closed_bars):
+    hub = replay(IntradayHub(max_bars=10))
+
+    for ticker, expected in closed_bars.groupby("ticker"):
+        bars = hub.snapshot(ticker)
+        assert [b["time"] for b in bars] == expected["time"].tolist()[-10:]
+        assert hub.snapshot(ticker, limit=3) == bars[-3:]
+    assert hub.stats()["bars"] == 20
+
+
+def test_running_indicators_match_the_batch_engine(closed_bars):
+    hub = replay(IntradayHub())
+    batch = compute_factors(closed_bars.rename(columns={"time": "date"})[["date", "ticker", "close"]].copy())
+
+    for ticker, expected in batch.groupby("ticker"):
+        bars = hub.snapshot(ticker)
+        for name in FACTOR_NAMES:
+            np.testing.assert_allclose(
+                [b[name] for b in bars], expected[name].to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True,
+                err_msg=f"{ticker} {name}",
+            )
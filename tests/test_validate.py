@@ -0,0 +1,102 @@
+"""Gap repair (airflow/scripts/validate.py) against the fixture data source."""
+from datetime import date
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from conftest import price_bars
+from data_sources import FixtureSource, MarketDataSource
+from state import SYNC_REGISTRY_SQL
+from validate import PRICE_ROW_COLUMNS, auto_repair_data, fetch_missing_bars, plan_downloads
+
+
+class FailingSource(MarketDataSource):
+    def download(self, tickers, start, end):
+        raise ConnectionError("no network in tests")
+
+
+def test_plan_downloads_groups_tickers_by_range():
+    d1, d2, d3 = date(2026, 1, 5), date(2026, 1, 6), date(2026, 1, 9)
+    gaps = [("AAA", d1, d2, 2), ("BBB", d1, d2, 2), ("CCC", d1, d2, 2), ("AAA", d3, d3, 1)]
+
+    assert list(plan_downloads(gaps, batch_size=2)) == [
+        (d1, d2, ["AAA", "BBB"]),
+        (d1, d2, ["CCC"]),
+        (d3, d3, ["AAA"]),
+    ]
+
+
+def test_fetch_missing_bars_only_returns_the_gap():
+    bars = price_bars(["AAA", "BBB"], 10)
+    days = sorted(bars["date"].unique())
+    rows = fetch_missing_bars(FixtureSource(bars), [("AAA", days[3], days[4], 2)])
+
+    assert [(r[0], r[1]) for r in rows] == [("AAA", days[3]), ("AAA", days[4])]
+    assert all(isinstance(r[7], int) for r in rows)
+
+
+def test_fetch_missing_bars_skips_a_failed_download():
+    day = date(2026, 1, 5)
+    assert fetch_missing_bars(FailingSource(), [("AAA", day, day, 1)]) == []
+
+
+def _insert(conn, bars):
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            f"INSERT INTO raw.price_ohlcv ({', '.join(PRICE_ROW_COLUMNS)}) VALUES %s",
+            list(bars[PRICE_ROW_COLUMNS].itertuples(index=False, name=None)),
+        )
+        cur.execute(SYNC_REGISTRY_SQL.format(source="raw.price_ohlcv"))
+        cur.execute(
+            "INSERT INTO system.ticker_watermarks (ticker, last_date) "
+            "SELECT ticker, MAX(date) FROM raw.price_ohlcv GROUP BY ticker"
+        )
+
+
+def _scalar(conn, sql, params=None):
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchone()[0]
+
+
+def test_auto_repair_data_fills_gaps_from_the_source(market_db):
+    bars = price_bars(["SPY", "AAA", "BBB"], 30)
+    days = sorted(bars["date"].unique())
+    # AAA misses days 10-12 and the last two days; BBB is complete
+    missing = (bars["ticker"] == "AAA") & bars["date"].isin(days[10:13] + days[-2:])
+    _insert(market_db, bars[~missing])
+
+    auto_repair_data(source=FixtureSource(bars), run_id="test_validate")
+
+    assert _scalar(market_db, "SELECT COUNT(*) FROM raw.price_ohlcv WHERE ticker = 'AAA'") == 30
+    assert _scalar(market_db, "SELECT row_count FROM analytics.ticker_registry WHERE ticker = 'AAA'") == 30
+    # The trailing repair moves the watermark, and the bars wait for finalize's factors
+    assert _scalar(market_db, "SELECT last_date FROM system.ticker_watermarks WHERE ticker = 'AAA'") == days[-1]
+    with market_db.cursor() as cur:
+        cur.execute("SELECT ticker, first_date FROM system.factor_queue")
+        assert cur.fetchall() == [("AAA", days[10])]
+    # Publishing is left to finalize_run
+    assert _scalar(market_db, "SELECT COUNT(*) FROM system.state WHERE key = 'data_version'") == 0
+
+
+def test_auto_repair_data_keeps_what_it_could_not_fetch(market_db):
+    bars = price_bars(["SPY", "AAA"], 20)
+    days = sorted(bars["date"].unique())
+    _insert(market_db, bars[~((bars["ticker"] == "AAA") & (bars["date"] == days[5]))])
+
+    auto_repair_data(source=FixtureSource(bars[bars["date"] != days[5]]), run_id="test_validate")
+
+    assert _scalar(market_db, "SELECT COUNT(*) FROM raw.price_ohlcv WHERE ticker = 'AAA'") == 19
+    assert _scalar(market_db, "SELECT COUNT(*) FROM system.factor_queue") == 0
+
+
+def test_fixture_source_matches_the_download_contract():
+    bars = price_bars(["AAA", "BBB"], 5)
+    days = sorted(bars["date"].unique())
+    df = FixtureSource(bars).download(["BBB"], days[1].isoformat(), days[3].isoformat())
+
+    assert list(df.columns) == ["date", "ticker", "open", "high", "low", "close", "adj_close", "volume"]
+    assert df["ticker"].unique().tolist() == ["BBB"]
+    # end is exclusive, like yfinance
+    assert df["date"].tolist() == [pd.Timestamp(d).date() for d in days[1:3]]